@@ -1,7 +1,11 @@
-from fastapi import Request
+from fastapi import Depends, Request
 from fastapi.security.http import HTTPBearer
-from app.domain.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.commonhelper.request_timing import measure
+from app.domain.database import get_db
+
+from app.dtos.auth_dtos import Principal
 from app.exceptions.app_exceptions import UnauthorizedRequestException
 from app.services import auth_service
 
@@ -10,9 +14,8 @@ class BearerAuth(HTTPBearer):
 
     def __init__(self, auto_error: bool = False):
         super().__init__(auto_error=auto_error)
-        self.db = SessionLocal()
 
-    async def __call__(self, request: Request):
+    async def __call__(self, request: Request, db: AsyncSession = Depends(get_db)) -> Principal:
         authorization = request.headers.get("Authorization", None)
 
         if not authorization:
@@ -26,7 +29,26 @@ class BearerAuth(HTTPBearer):
         if scheme.lower() != "bearer":
             raise UnauthorizedRequestException("Invalid authentication scheme")
 
-        if not auth_service.verify_jwt(self.db, token):
+        with measure("auth"):
+            principal = await auth_service.get_principal(db, token)
+
+        if not principal:
             raise UnauthorizedRequestException("Invalid or expired token")
 
-        return True
+        request.state.principal = principal
+
+        return principal
+
+
+bearer_auth = BearerAuth()
+
+
+async def get_principal(request: Request, db: AsyncSession = Depends(get_db)) -> Principal:
+    """Provide the principal resolved by BearerAuth for the current request"""
+
+    principal = getattr(request.state, "principal", None)
+
+    if not principal:
+        principal = await bearer_auth(request, db)
+
+    return principal
@@ -0,0 +1,114 @@
+import hashlib
+import time
+
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+from app.domain.config import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS
+from app.dtos.auth_dtos import Principal
+from app.dtos.metrics_dtos import TokenCacheMetricsResponse
+
+
+class TokenCacheEntry(NamedTuple):
+    principal: Principal
+    token_version: int
+    expires_at: float
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens keyed by token digest, with a per-user index for eviction
+
+    Evictions are local to the process. Other workers only reject a cached token once their token
+    revocation table refreshes, so a revocation can take up to TOKEN_REVOCATION_REFRESH_SECONDS
+    (capped by the cache TTL) to reach them.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[bytes, TokenCacheEntry]" = OrderedDict()
+        self.user_digests: Dict[int, Set[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[TokenCacheEntry]:
+        digest = get_digest(token)
+        entry = self.entries.get(digest)
+
+        if not entry or entry.expires_at <= time.time():
+            if entry:
+                self.remove(digest)
+
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(digest)
+        self.hits += 1
+
+        return entry
+
+    def put(self, token: str, principal: Principal, token_version: int, expiry: float) -> None:
+        if self.max_size <= 0:
+            return
+
+        digest = get_digest(token)
+        expires_at = min(expiry, time.time() + self.ttl)
+
+        self.remove(digest)
+        self.entries[digest] = TokenCacheEntry(principal, token_version, expires_at)
+        self.user_digests.setdefault(principal.id, set()).add(digest)
+
+        while len(self.entries) > self.max_size:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, digest: bytes) -> None:
+        entry = self.entries.pop(digest, None)
+
+        if not entry:
+            return
+
+        digests = self.user_digests.get(entry.principal.id)
+
+        if digests is not None:
+            digests.discard(digest)
+
+            if not digests:
+                del self.user_digests[entry.principal.id]
+
+    def evict_user(self, user_id: int) -> None:
+        for digest in list(self.user_digests.get(user_id, ())):
+            self.remove(digest)
+
+
+cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
+
+def is_enabled() -> bool:
+    return cache.max_size > 0
+
+
+def get_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def get(token: str) -> Optional[TokenCacheEntry]:
+    return cache.get(token)
+
+
+def put(token: str, principal: Principal, token_version: int, expiry: float) -> None:
+    cache.put(token, principal, token_version, expiry)
+
+
+def evict_user(user_id: int) -> None:
+    cache.evict_user(user_id)
+
+
+def get_metrics() -> TokenCacheMetricsResponse:
+
+    return TokenCacheMetricsResponse(
+        size=len(cache.entries),
+        max_size=cache.max_size,
+        ttl_seconds=cache.ttl,
+        hits=cache.hits,
+        misses=cache.misses
+    )
@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+from typing import Dict, Optional
+
+from app.data.models import User
+from app.domain.config import TOKEN_REVOCATION_REFRESH_SECONDS
+from app.domain.database import SessionLocal
+
+
+class TokenRevocationTable:
+    """Minimum accepted token version per user, for users that have ever had their tokens revoked"""
+
+    def __init__(self):
+        self.versions: Dict[int, int] = {}
+        self.refresh_task: Optional[asyncio.Task] = None
+
+
+table = TokenRevocationTable()
+
+
+def is_revoked(user_id: int, token_version: int) -> bool:
+    return token_version < table.versions.get(user_id, 0)
+
+
+def revoke(user_id: int, token_version: int) -> None:
+    """Reject tokens issued before token_version; call once the new version is committed"""
+
+    if token_version > table.versions.get(user_id, 0):
+        table.versions[user_id] = token_version
+
+
+def refresh() -> None:
+    db = SessionLocal()
+
+    try:
+        rows = db.query(User.id, User.token_version).filter(User.token_version > 0).all()
+    finally:
+        db.close()
+
+    versions = {user_id: token_version for user_id, token_version in rows}
+
+    # Versions only ever grow, so keep any local revocation committed after the query started
+    for user_id, token_version in table.versions.items():
+        if token_version > versions.get(user_id, 0):
+            versions[user_id] = token_version
+
+    table.versions = versions
+
+
+async def run_refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(TOKEN_REVOCATION_REFRESH_SECONDS)
+
+        try:
+            await run_in_threadpool(refresh)
+        except Exception as e:
+            logger.error(f"Failed to refresh token revocation table; {e}")
+
+
+async def start() -> None:
+    await run_in_threadpool(refresh)
+    logger.info(f"Loaded token revocation table; {len(table.versions)} entries")
+
+    table.refresh_task = asyncio.get_running_loop().create_task(run_refresh_loop())
+
+
+def stop() -> None:
+    if table.refresh_task:
+        table.refresh_task.cancel()
+        table.refresh_task = None
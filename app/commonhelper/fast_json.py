@@ -0,0 +1,74 @@
+import functools
+import orjson
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Any, Callable
+
+from app.commonhelper.request_timing import TimedRoute, time_endpoint
+from app.domain.config import FAST_JSON_RESPONSES, REQUEST_TIMING
+
+
+def encode_model(obj: Any) -> Any:
+    """orjson fallback for pydantic models: their field values are already JSON-ready"""
+
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+
+    raise TypeError
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=encode_model)
+
+
+class FastJSONRoute(TimedRoute):
+    """Route that hands the endpoint's return value straight to orjson
+
+    FastAPI otherwise validates the result against response_model and walks it with
+    jsonable_encoder, which repeats work the mappers already did. response_model is kept for
+    the OpenAPI schema only, so endpoints must return exactly that shape.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+
+        # include_router rebuilds every route from the already wrapped endpoint
+        if kwargs.get("response_model") is not None and not getattr(endpoint, "renders_fast_json", False):
+
+            # Time the endpoint inside the wrapper, so orjson rendering counts as serialize
+            if REQUEST_TIMING:
+                endpoint = time_endpoint(endpoint)
+
+            endpoint = self.wrap_endpoint(endpoint, kwargs.get("status_code") or 200)
+
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def wrap_endpoint(endpoint: Callable, status_code: int) -> Callable:
+
+        @functools.wraps(endpoint)
+        async def fast_json_endpoint(*args, **kwargs):
+            content = await endpoint(*args, **kwargs)
+
+            if isinstance(content, Response):
+                return content
+
+            response = FastJSONResponse(content, status_code=status_code)
+
+            # Carry over headers set on an injected Response, as FastAPI does for its own responses
+            for value in kwargs.values():
+                if isinstance(value, Response):
+                    response.headers.raw.extend(value.headers.raw)
+
+            return response
+
+        fast_json_endpoint.renders_fast_json = True
+
+        return fast_json_endpoint
+
+
+JSONRoute = FastJSONRoute if FAST_JSON_RESPONSES else TimedRoute
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import hmac
+import json
+
+from typing import List, Optional
+
+from app.domain.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, SECRET_KEY
+from app.exceptions.app_exceptions import BadRequestException
+
+
+# Cursor values are bound as 64-bit integers, the widest column type a cursor can key on
+CURSOR_VALUE_MIN = -2 ** 63
+CURSOR_VALUE_MAX = 2 ** 63 - 1
+CURSOR_SIGNATURE_SIZE = 16
+
+
+def get_page_size(limit: Optional[int]) -> int:
+
+    if limit is None:
+        return PAGE_SIZE_DEFAULT
+
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+
+def encode_cursor(*values: int) -> str:
+    """Pack the sort key of the last row on a page into an opaque url-safe token
+
+    The token is signed, so values the server derived, such as how many leaderboard entries were
+    already served, cannot be forged by the client.
+    """
+
+    payload = json.dumps(values, separators=(",", ":")).encode()
+
+    return f"{encode_base64(payload)}.{encode_base64(get_signature(payload))}"
+
+
+def decode_cursor(cursor: str, size: int) -> List[int]:
+
+    try:
+        payload, signature = (decode_base64(part) for part in cursor.split("."))
+    except ValueError:
+        raise BadRequestException("Invalid cursor")
+
+    if not hmac.compare_digest(signature, get_signature(payload)):
+        raise BadRequestException("Invalid cursor")
+
+    try:
+        values = json.loads(payload)
+    except ValueError:
+        raise BadRequestException("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise BadRequestException("Invalid cursor")
+
+    if not all(type(value) is int and CURSOR_VALUE_MIN <= value <= CURSOR_VALUE_MAX for value in values):
+        raise BadRequestException("Invalid cursor")
+
+    return values
+
+
+def get_signature(payload: bytes) -> bytes:
+    return hmac.new(SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:CURSOR_SIGNATURE_SIZE]
+
+
+def encode_base64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_base64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
@@ -0,0 +1,84 @@
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+from app.domain.config import PROMETHEUS_MULTIPROC_DIR
+
+
+HTTP_REQUESTS = Counter(
+    "amber_http_requests",
+    "HTTP requests by route and status code",
+    ["method", "route", "status_code"]
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "amber_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"]
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "amber_http_requests_in_progress",
+    "HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+
+DB_QUERIES = Counter(
+    "amber_db_queries",
+    "Statements executed while serving requests, by route",
+    ["route"]
+)
+
+DB_QUERY_DURATION = Counter(
+    "amber_db_query_seconds",
+    "Time spent executing statements while serving requests, by route",
+    ["route"]
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "amber_db_pool_checkouts",
+    "Connection pool checkouts",
+    ["engine"]
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    "amber_db_pool_timeouts",
+    "Connection pool checkouts that gave up after pool_timeout",
+    ["engine"]
+)
+
+DB_POOL_WAIT = Histogram(
+    "amber_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "amber_db_pool_checked_out_connections",
+    "Pooled connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+
+
+def render_metrics() -> bytes:
+    """Render this process's metrics, or every worker's when PROMETHEUS_MULTIPROC_DIR is set
+
+    In multiprocess mode prometheus_client keeps values in memory-mapped files in that directory,
+    so whichever worker serves the scrape reports the totals of all of them.
+    """
+
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+        return generate_latest(registry)
+
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop an exiting worker's live gauges from the aggregated values"""
+
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
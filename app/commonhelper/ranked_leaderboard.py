@@ -0,0 +1,108 @@
+from datetime import datetime
+from sortedcontainers import SortedList
+from typing import Dict, List, Optional
+
+
+EPOCH = datetime(1970, 1, 1)
+
+USER_ID_BITS = 40
+GAME_ID_BITS = 48
+CREATED_ON_BITS = 56
+SCORE_BITS = 64
+
+GAME_ID_SHIFT = USER_ID_BITS
+CREATED_ON_SHIFT = GAME_ID_SHIFT + GAME_ID_BITS
+SCORE_SHIFT = CREATED_ON_SHIFT + CREATED_ON_BITS
+
+MAX_SCORE = 2 ** (SCORE_BITS - 1) - 1
+MAX_USER_ID = 2 ** USER_ID_BITS - 1
+
+
+class LeaderboardEntry:
+    __slots__ = ("user_id", "game_id", "score", "created_on")
+
+    def __init__(self, user_id: int, game_id: int, score: int, created_on: datetime):
+        self.user_id = user_id
+        self.game_id = game_id
+        self.score = score
+        self.created_on = created_on
+
+
+def pack(user_id: int, game_id: int, score: int, created_on: datetime) -> int:
+    """Encode an entry as a single int whose natural order is score desc, created_on asc, game_id asc"""
+
+    created_on_us = (created_on - EPOCH) // datetime.resolution
+
+    return (
+        (MAX_SCORE - score) << SCORE_SHIFT
+        | created_on_us << CREATED_ON_SHIFT
+        | game_id << GAME_ID_SHIFT
+        | user_id
+    )
+
+
+def unpack(key: int) -> LeaderboardEntry:
+    user_id = key & ((1 << USER_ID_BITS) - 1)
+    game_id = (key >> GAME_ID_SHIFT) & ((1 << GAME_ID_BITS) - 1)
+    created_on_us = (key >> CREATED_ON_SHIFT) & ((1 << CREATED_ON_BITS) - 1)
+    score = MAX_SCORE - (key >> SCORE_SHIFT)
+
+    return LeaderboardEntry(user_id, game_id, score, EPOCH + created_on_us * datetime.resolution)
+
+
+class RankedLeaderboard:
+    """One entry per user ranked by score desc then created_on, with O(log n) updates
+
+    Entries are stored as packed ints: one sorted list for the ranking and one dict from user to
+    key, so each player costs a couple of machine words plus one small int object.
+    """
+
+    __slots__ = ("keys", "user_keys")
+
+    def __init__(self):
+        self.keys = SortedList()
+        self.user_keys: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.user_keys)
+
+    def record(self, user_id: int, game_id: int, score: int, created_on: datetime) -> bool:
+        """Keep the game if it ranks above the user's current entry; return whether the board changed"""
+
+        key = pack(user_id, game_id, score, created_on)
+        current_key = self.user_keys.get(user_id)
+
+        if current_key is not None:
+            if current_key <= key:
+                return False
+
+            self.keys.remove(current_key)
+
+        self.keys.add(key)
+        self.user_keys[user_id] = key
+
+        return True
+
+    def top(self, limit: Optional[int] = None, after: Optional[LeaderboardEntry] = None) -> List[LeaderboardEntry]:
+        """Return up to limit entries, starting below the position of after when given"""
+
+        start = 0
+
+        if after is not None:
+            start = self.keys.bisect_right(pack(MAX_USER_ID, after.game_id, after.score, after.created_on))
+
+        stop = None if limit is None else start + limit
+
+        return [unpack(key) for key in self.keys.islice(start, stop)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        key = self.user_keys.get(user_id)
+
+        if key is None:
+            return None
+
+        return self.keys.index(key) + 1
+
+    def clear(self) -> None:
+        self.keys.clear()
+        self.user_keys.clear()
@@ -0,0 +1,83 @@
+import functools
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+from typing import Callable, Iterator, Optional
+
+from app.domain.config import REQUEST_TIMING
+
+
+class RequestTiming:
+    """Where the time serving one request went
+
+    Phases may overlap: auth includes the queries it runs, which are also counted under db.
+    serialize runs from the endpoint returning until the response starts.
+    """
+
+    __slots__ = ("queries", "db", "auth", "serialize", "endpoint_finished")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.auth = 0.0
+        self.serialize = 0.0
+        self.endpoint_finished: Optional[float] = None
+
+    def get_server_timing(self) -> str:
+        return (
+            f"db;dur={self.db * 1000:.2f};desc=\"{self.queries} queries\", "
+            f"auth;dur={self.auth * 1000:.2f}, "
+            f"serialize;dur={self.serialize * 1000:.2f}"
+        )
+
+
+request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def measure(phase: str) -> Iterator[None]:
+    """Add the time spent in the block to a phase of the current request's timing, if it is being timed"""
+
+    timing = request_timing.get()
+
+    if not timing:
+        yield
+        return
+
+    started = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        setattr(timing, phase, getattr(timing, phase) + time.perf_counter() - started)
+
+
+def time_endpoint(endpoint: Callable) -> Callable:
+
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timing = request_timing.get()
+
+            if timing:
+                timing.endpoint_finished = time.perf_counter()
+
+    timed_endpoint.records_endpoint_time = True
+
+    return timed_endpoint
+
+
+class TimedRoute(APIRoute):
+    """Route that records when its endpoint returns, so the time until the response starts counts as serialize"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+
+        # include_router rebuilds every route from the already wrapped endpoint
+        if REQUEST_TIMING and not getattr(endpoint, "records_endpoint_time", False):
+            endpoint = time_endpoint(endpoint)
+
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import inspect
+
+from typing import Callable, Dict, Hashable, Iterable
+
+
+class SingleFlightGroup:
+    """Calls of one function currently in flight, keyed by their arguments"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.executions
+
+
+groups: Dict[str, SingleFlightGroup] = {}
+
+
+def single_flight(ignore: Iterable[str] = ()) -> Callable:
+    """Collapse concurrent calls with equal arguments into one execution whose result all callers share
+
+    Arguments named in ignore are left out of the key; the first caller's values are the ones used.
+    The shared run is shielded so one caller going away does not cancel it for the others, so it must
+    not borrow anything a caller owns, such as its request session; it should open its own.
+    """
+
+    ignored = set(ignore)
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        group = groups.setdefault(f"{func.__module__}.{func.__qualname__}", SingleFlightGroup(func.__qualname__))
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            key = tuple((name, value) for name, value in bound.arguments.items() if name not in ignored)
+
+            try:
+                hash(key)
+            except TypeError:
+                return await func(*args, **kwargs)
+
+            group.calls += 1
+            task = group.in_flight.get(key)
+
+            if task is None:
+                group.executions += 1
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                group.in_flight[key] = task
+                task.add_done_callback(lambda done: group.in_flight.pop(key, None) if group.in_flight.get(key) is done else None)
+
+            return await asyncio.shield(task)
+
+        wrapper.single_flight_group = group
+
+        return wrapper
+
+    return decorator
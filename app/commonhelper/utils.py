@@ -1,34 +1,112 @@
 import hashlib
+import hmac
 import os
 import random
 
-from typing import List, Tuple
+from typing import NamedTuple, Optional
 
-from app.data.models import Game
+from app.domain.config import PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_DKLEN, PASSWORD_HASH_ITERATIONS, \
+    PASSWORD_HASH_SCRYPT_N, PASSWORD_HASH_SCRYPT_P, PASSWORD_HASH_SCRYPT_R
+from app.dtos.auth_dtos import PasswordDto
 
 
-def generate_hash_and_salt(password: str) -> Tuple[bytes, bytes]:
+PBKDF2_SHA256 = "pbkdf2_sha256"
+SCRYPT = "scrypt"
+
+
+class PasswordHashParams(NamedTuple):
+    """Key derivation parameters, stored on each user as e.g. 'pbkdf2_sha256$i=100000,l=32'"""
+
+    algorithm: str
+    dklen: int
+    iterations: int = 0
+    n: int = 0
+    r: int = 0
+    p: int = 0
+
+    def to_format(self) -> str:
+        if self.algorithm == SCRYPT:
+            return f"{SCRYPT}$n={self.n},r={self.r},p={self.p},l={self.dklen}"
+
+        return f"{self.algorithm}$i={self.iterations},l={self.dklen}"
+
+    @classmethod
+    def from_format(cls, password_hash_format: Optional[str]) -> "PasswordHashParams":
+        if not password_hash_format:
+            return LEGACY_PASSWORD_HASH_PARAMS
+
+        algorithm, _, encoded_params = password_hash_format.partition("$")
+        params = dict(param.split("=") for param in encoded_params.split(","))
+
+        return cls(
+            algorithm=algorithm,
+            dklen=int(params["l"]),
+            iterations=int(params.get("i", 0)),
+            n=int(params.get("n", 0)),
+            r=int(params.get("r", 0)),
+            p=int(params.get("p", 0))
+        )
+
+
+# Rows written before the hash format was recorded: a 128 byte PBKDF2-SHA256 key, which runs
+# four full PBKDF2 chains for no more strength than a single 32 byte one
+LEGACY_PASSWORD_HASH_PARAMS = PasswordHashParams(algorithm=PBKDF2_SHA256, dklen=128, iterations=100000)
+
+PASSWORD_HASH_POLICY = PasswordHashParams(
+    algorithm=PASSWORD_HASH_ALGORITHM,
+    dklen=PASSWORD_HASH_DKLEN,
+    iterations=PASSWORD_HASH_ITERATIONS if PASSWORD_HASH_ALGORITHM == PBKDF2_SHA256 else 0,
+    n=PASSWORD_HASH_SCRYPT_N if PASSWORD_HASH_ALGORITHM == SCRYPT else 0,
+    r=PASSWORD_HASH_SCRYPT_R if PASSWORD_HASH_ALGORITHM == SCRYPT else 0,
+    p=PASSWORD_HASH_SCRYPT_P if PASSWORD_HASH_ALGORITHM == SCRYPT else 0
+)
+
+
+def derive_password_key(password: str, salt: bytes, params: PasswordHashParams) -> bytes:
+    if params.algorithm == SCRYPT:
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt,
+            n=params.n,
+            r=params.r,
+            p=params.p,
+            maxmem=256 * params.n * params.r,
+            dklen=params.dklen
+        )
+
+    if params.algorithm == PBKDF2_SHA256:
+        return hashlib.pbkdf2_hmac(
+            "sha256",
+            password.encode("utf-8"),
+            salt,
+            params.iterations,
+            dklen=params.dklen
+        )
+
+    raise ValueError(f"Unsupported password hash algorithm: '{params.algorithm}'")
+
+
+def generate_hash_and_salt(password: str) -> PasswordDto:
     salt = os.urandom(32)
-    key = hashlib.pbkdf2_hmac(
-        "sha256",
-        password.encode("utf-8"),
-        salt,
-        100000,
-        dklen=128
+    key = derive_password_key(password, salt, PASSWORD_HASH_POLICY)
+
+    return PasswordDto(
+        password_hash=key,
+        password_salt=salt,
+        password_hash_format=PASSWORD_HASH_POLICY.to_format()
     )
 
-    return key, salt
 
+def verify_password_hash(password: str, stored_password: PasswordDto) -> bool:
+    params = PasswordHashParams.from_format(stored_password.password_hash_format)
+    key = derive_password_key(password, stored_password.password_salt, params)
 
-def generate_code(length: int, key_space: str) -> str:
-    return ''.join((random.choice(key_space) for x in range(length)))
+    return hmac.compare_digest(key, stored_password.password_hash)
 
 
-def remove_duplicates(games: List[Game]) -> List[Game]:
-    result_dict = {}
+def password_needs_rehash(password_hash_format: Optional[str]) -> bool:
+    return password_hash_format != PASSWORD_HASH_POLICY.to_format()
 
-    for game in games:
-        if game.user_id not in result_dict.keys():
-            result_dict[game.user_id] = game
 
-    return list(result_dict.values())
+def generate_code(length: int, key_space: str) -> str:
+    return ''.join((random.choice(key_space) for x in range(length)))
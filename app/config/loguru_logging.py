@@ -0,0 +1,25 @@
+import logging
+import sys
+
+from loguru import logger
+from typing import Dict
+
+from app.domain.config import JSON_LOGS_CONFIG, LOG_LEVEL_CONFIG
+
+
+def setup_loguru_sink() -> None:
+    """Replace the default stderr sink with an enqueued one, so request handlers never block on log writes"""
+
+    logger.remove()
+    logger.add(sys.stderr, level=LOG_LEVEL_CONFIG, serialize=JSON_LOGS_CONFIG, enqueue=True)
+
+
+def apply_logger_levels(levels: Dict[str, str]) -> None:
+    """Set standard library logger levels by name
+
+    SQLAlchemy checks its logger before building a record, so sqlalchemy.engine=WARNING stops
+    statement echoing at the source rather than in a handler.
+    """
+
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level.upper())
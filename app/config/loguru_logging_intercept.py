@@ -5,11 +5,23 @@ from typing import cast
 
 from loguru import logger
 
+from app.domain.config import LOG_LEVEL_CONFIG
+
 
 class InterceptHandler(logging.Handler):
-    """Logs to loguru from Python logging module"""
+    """Logs to loguru from Python logging module
+
+    The handler level is never below LOG_LEVEL_CONFIG, so records the loguru sink would drop are
+    rejected before the frame walk and message formatting.
+    """
+
+    def __init__(self, level: int = logging.NOTSET):
+        super().__init__(max(level, logger.level(LOG_LEVEL_CONFIG).no))
 
     def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < self.level:
+            return
+
         try:
             level = logger.level(record.levelname).name
         except ValueError:
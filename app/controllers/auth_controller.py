@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.commonhelper.fast_json import JSONRoute
 from app.domain.constants import AUTH_URL
 from app.domain.database import get_db
 from app.dtos.auth_dtos import AccessTokenResponse, ExternalLoginRequest, ResetPasswordRequest, ForgotPasswordRequest, LoginRequest
@@ -10,13 +11,15 @@ from app.services import auth_service
 
 controller = APIRouter(
     prefix=AUTH_URL,
-    tags=["Auth"]
+    tags=["Auth"],
+    route_class=JSONRoute
 )
 
 
 @controller.post(
     path="/login",
     status_code=200,
+    response_model=AccessTokenResponse,
     responses={
         200: {"model": AccessTokenResponse},
         401: {"model": ErrorResponse},
@@ -25,16 +28,17 @@ controller = APIRouter(
 )
 async def get_access_token(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate access token for valid credentials"""
 
-    return auth_service.get_access_token(db, login_data)
+    return await auth_service.get_access_token(db, login_data)
 
 
 @controller.post(
     path="/external-login",
     status_code=200,
+    response_model=AccessTokenResponse,
     responses={
         200: {"model": AccessTokenResponse},
         422: {"model": ValidationErrorResponse}
@@ -42,11 +46,11 @@ async def get_access_token(
 )
 async def get_access_token_for_external_login(
     external_login_data: ExternalLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate access token for valid credentials for social login"""
 
-    return auth_service.get_access_token_for_external_login(db, external_login_data)
+    return await auth_service.get_access_token_for_external_login(db, external_login_data)
 
 
 @controller.post(
@@ -60,16 +64,17 @@ async def get_access_token_for_external_login(
 )
 async def forgot_password(
     forgot_password_data: ForgotPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate password reset link"""
 
-    auth_service.forgot_password(db, forgot_password_data)
+    await auth_service.forgot_password(db, forgot_password_data)
 
 
 @controller.post(
     path="/reset-password",
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         404: {"model": ErrorResponse},
@@ -78,8 +83,8 @@ async def forgot_password(
 )
 async def reset_password(
     reset_password_data: ResetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Reset user password"""
 
-    return auth_service.reset_password(db, reset_password_data)
+    return await auth_service.reset_password(db, reset_password_data)
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm.session import Session
-from typing import List
-
-from app.auth.bearer import BearerAuth
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.auth.bearer import BearerAuth, get_principal
+from app.commonhelper.fast_json import JSONRoute
+from app.data.enums import LeaderboardPeriod
 from app.domain.constants import GAMES_URL
 from app.domain.database import get_db
+from app.dtos.auth_dtos import Principal
 from app.dtos.error_dtos import ErrorResponse, ValidationErrorResponse
-from app.dtos.game_dtos import GameResponse, GameCreateRequest
+from app.dtos.game_dtos import GameBatchCreateRequest, GameExportFormat, GameResponse, GameCreateRequest
+from app.dtos.pagination_dtos import PagedResponse
 from app.services import game_service
 
 controller = APIRouter(
     prefix=GAMES_URL,
-    tags=["Games"]
+    tags=["Games"],
+    route_class=JSONRoute
 )
 
 
@@ -19,95 +26,180 @@ controller = APIRouter(
     path="",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=GameResponse,
     responses={
         200: {"model": GameResponse},
         401: {"model": ErrorResponse},
-        422: {"model": ValidationErrorResponse}
+        422: {"model": ValidationErrorResponse},
+        503: {"model": ErrorResponse}
     }
 )
 async def create_game(
         game_data: GameCreateRequest,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
-    """Create new game"""
+    """Create new game; while ingestion is buffered, id is null until the game is flushed"""
 
-    return game_service.create_game(db, request, game_data)
+    return await game_service.create_game(db, current_user, game_data)
+
+
+@controller.post(
+    path="/batch",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_model=List[GameResponse],
+    responses={
+        200: {"model": List[GameResponse]},
+        401: {"model": ErrorResponse},
+        422: {"model": ValidationErrorResponse}
+    }
+)
+async def create_games(
+        batch: GameBatchCreateRequest,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
+):
+    """Create a batch of games"""
+
+    return await game_service.create_games(db, current_user, batch)
 
 
 @controller.get(
     path="",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=PagedResponse[GameResponse],
     responses={
-        200: {"model": List[GameResponse]},
+        200: {"model": PagedResponse[GameResponse]},
+        400: {"model": ErrorResponse},
         401: {"model": ErrorResponse}
     }
 )
 async def get_games(
-        request: Request,
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Get games"""
 
-    return game_service.get_games(db, request)
+    return await game_service.get_games(db, current_user, cursor, limit)
+
+
+@controller.get(
+    path="/export",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse},
+        422: {"model": ValidationErrorResponse}
+    }
+)
+async def export_games(
+        format: GameExportFormat = GameExportFormat.NDJSON,
+        user_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        current_user: Principal = Depends(get_principal)
+):
+    """Export games as NDJSON or CSV; admin only"""
+
+    return game_service.export_games(current_user, format, user_id, created_from, created_to)
 
 
 @controller.get(
     path="/daily-leaderboard",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=PagedResponse[GameResponse],
     responses={
-        200: {"model": List[GameResponse]},
+        200: {"model": PagedResponse[GameResponse]},
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+        400: {"model": ErrorResponse},
         401: {"model": ErrorResponse}
     }
 )
 async def get_daily_leaderboard(
-        db: Session = Depends(get_db)
+        response: Response,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        if_none_match: Optional[str] = Header(None)
 ):
     """Get daily leaderboard"""
 
-    return game_service.get_daily_leaderboard(db)
+    not_modified = await game_service.check_leaderboard_etag(LeaderboardPeriod.DAILY, if_none_match, response)
+
+    if not_modified:
+        return not_modified
+
+    return await game_service.get_daily_leaderboard(cursor, limit)
 
 
 @controller.get(
     path="/weekly-leaderboard",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=PagedResponse[GameResponse],
     responses={
-        200: {"model": List[GameResponse]},
+        200: {"model": PagedResponse[GameResponse]},
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+        400: {"model": ErrorResponse},
         401: {"model": ErrorResponse}
     }
 )
 async def get_weekly_leaderboard(
-        db: Session = Depends(get_db)
+        response: Response,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        if_none_match: Optional[str] = Header(None)
 ):
     """Get weekly leaderboard"""
 
-    return game_service.get_weekly_leaderboard(db)
+    not_modified = await game_service.check_leaderboard_etag(LeaderboardPeriod.WEEKLY, if_none_match, response)
+
+    if not_modified:
+        return not_modified
+
+    return await game_service.get_weekly_leaderboard(cursor, limit)
 
 
 @controller.get(
     path="/all-time-leaderboard",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=PagedResponse[GameResponse],
     responses={
-        200: {"model": List[GameResponse]},
+        200: {"model": PagedResponse[GameResponse]},
+        304: {"description": "Leaderboard unchanged since the ETag in If-None-Match"},
+        400: {"model": ErrorResponse},
         401: {"model": ErrorResponse}
     }
 )
 async def get_all_time_leaderboard(
-        db: Session = Depends(get_db)
+        response: Response,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        if_none_match: Optional[str] = Header(None)
 ):
     """Get all-time leaderboard"""
 
-    return game_service.get_all_time_leaderboard(db)
+    not_modified = await game_service.check_leaderboard_etag(LeaderboardPeriod.ALL_TIME, if_none_match, response)
+
+    if not_modified:
+        return not_modified
+
+    return await game_service.get_all_time_leaderboard(cursor, limit)
 
 
 @controller.get(
     path="/{id}",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=GameResponse,
     responses={
         200: {"model": GameResponse},
         401: {"model": ErrorResponse},
@@ -118,9 +210,9 @@ async def get_all_time_leaderboard(
 )
 async def get_game(
         id: int,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Get game"""
 
-    return game_service.get_game(db, id, request)
+    return await game_service.get_game(db, id, current_user)
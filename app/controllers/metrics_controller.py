@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from typing import List
+
+from app.auth.bearer import BearerAuth, get_principal
+from app.commonhelper.fast_json import JSONRoute
+from app.domain.constants import METRICS_URL
+from app.dtos.auth_dtos import Principal
+from app.dtos.error_dtos import ErrorResponse
+from app.dtos.metrics_dtos import DatabasePoolMetricsResponse, PasswordHashingMetricsResponse, SingleFlightMetricsResponse, \
+    TokenCacheMetricsResponse
+from app.services import metrics_service
+
+
+controller = APIRouter(
+    prefix=METRICS_URL,
+    tags=["Metrics"],
+    route_class=JSONRoute
+)
+
+
+@controller.get(
+    path="/password-hashing",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_model=PasswordHashingMetricsResponse,
+    responses={
+        200: {"model": PasswordHashingMetricsResponse},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse}
+    }
+)
+async def get_password_hashing_metrics(
+        current_user: Principal = Depends(get_principal)
+):
+    """Get password hashing pool metrics"""
+
+    return metrics_service.get_password_hashing_metrics(current_user)
+
+
+@controller.get(
+    path="/token-cache",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_model=TokenCacheMetricsResponse,
+    responses={
+        200: {"model": TokenCacheMetricsResponse},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse}
+    }
+)
+async def get_token_cache_metrics(
+        current_user: Principal = Depends(get_principal)
+):
+    """Get verified token cache metrics"""
+
+    return metrics_service.get_token_cache_metrics(current_user)
+
+
+@controller.get(
+    path="/db-pool",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_model=List[DatabasePoolMetricsResponse],
+    responses={
+        200: {"model": List[DatabasePoolMetricsResponse]},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse}
+    }
+)
+async def get_database_pool_metrics(
+        current_user: Principal = Depends(get_principal)
+):
+    """Get database connection pool metrics"""
+
+    return metrics_service.get_database_pool_metrics(current_user)
+
+
+@controller.get(
+    path="/single-flight",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_model=List[SingleFlightMetricsResponse],
+    responses={
+        200: {"model": List[SingleFlightMetricsResponse]},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse}
+    }
+)
+async def get_single_flight_metrics(
+        current_user: Principal = Depends(get_principal)
+):
+    """Get request coalescing metrics"""
+
+    return metrics_service.get_single_flight_metrics(current_user)
+
+
+@controller.get(
+    path="/prometheus",
+    dependencies=[Depends(BearerAuth())],
+    status_code=200,
+    response_class=Response,
+    responses={
+        200: {"content": {CONTENT_TYPE_LATEST: {}}},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse}
+    }
+)
+async def get_prometheus_metrics(
+        current_user: Principal = Depends(get_principal)
+):
+    """Get request, database and connection pool metrics in Prometheus text format"""
+
+    return Response(content=metrics_service.get_prometheus_metrics(current_user), media_type=CONTENT_TYPE_LATEST)
@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm.session import Session
-from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from app.domain.constants import USERS_URL
 from app.domain.database import get_db
-from app.auth.bearer import BearerAuth
+from app.auth.bearer import BearerAuth, get_principal
+from app.commonhelper.fast_json import JSONRoute
 from app.dtos.user_dtos import UserResponse, UserCreateRequest, UserAvatarRequest, UserUpdateRequest, UserAdminStatusRequest
+from app.dtos.auth_dtos import Principal
+from app.dtos.pagination_dtos import PagedResponse
 from app.dtos.error_dtos import ErrorResponse, ValidationErrorResponse
 from app.services import user_service
 
 
 controller = APIRouter(
     prefix=USERS_URL,
-    tags=["Users"]
+    tags=["Users"],
+    route_class=JSONRoute
 )
 
 
 @controller.post(
     path="",
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         422: {"model": ValidationErrorResponse}
@@ -26,36 +31,40 @@ controller = APIRouter(
 )
 async def create_user(
         user_data: UserCreateRequest,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Create new user"""
 
-    return user_service.create_user(db, user_data)
+    return await user_service.create_user(db, user_data)
 
 
 @controller.get(
     path="",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=PagedResponse[UserResponse],
     responses={
-        200: {"model": List[UserResponse]},
+        200: {"model": PagedResponse[UserResponse]},
+        400: {"model": ErrorResponse},
         401: {"model": ErrorResponse},
         403: {"model": ErrorResponse}
     }
 )
 async def get_users(
-        request: Request,
-        db: Session = Depends(get_db)
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        current_user: Principal = Depends(get_principal)
 ):
     """Get users"""
 
-    return user_service.get_users(db, request)
+    return await user_service.get_users(current_user, cursor, limit)
 
 
 @controller.get(
     path="/me",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         401: {"model": ErrorResponse},
@@ -63,18 +72,19 @@ async def get_users(
     }
 )
 async def get_current_user(
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Get current user"""
 
-    return user_service.get_current_user(db, request)
+    return await user_service.get_current_user(db, current_user)
 
 
 @controller.put(
     path="/avatar",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         401: {"model": ErrorResponse},
@@ -83,18 +93,19 @@ async def get_current_user(
 )
 async def set_user_avatar(
         user_avatar: UserAvatarRequest,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Update user avatar"""
 
-    return user_service.set_user_avatar(db, user_avatar, request)
+    return await user_service.set_user_avatar(db, user_avatar, current_user)
 
 
 @controller.get(
     path="/{id}",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         401: {"model": ErrorResponse},
@@ -105,18 +116,19 @@ async def set_user_avatar(
 )
 async def get_user(
         id: int,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Get user by id"""
 
-    return user_service.get_user(db, id, request)
+    return await user_service.get_user(db, id, current_user)
 
 
 @controller.put(
     path="/{id}",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         400: {"model": ErrorResponse},
@@ -128,18 +140,19 @@ async def get_user(
 async def update_user(
         id: int,
         user_data: UserUpdateRequest,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Update user"""
 
-    return user_service.update_user(db, id, request, user_data)
+    return await user_service.update_user(db, id, current_user, user_data)
 
 
 @controller.put(
     path="/{id}/admin-status",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=UserResponse,
     responses={
         200: {"model": UserResponse},
         400: {"model": ErrorResponse},
@@ -152,9 +165,9 @@ async def update_user(
 async def change_admin_status(
         id: int,
         user_admin_status: UserAdminStatusRequest,
-        request: Request,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_principal)
 ):
     """Update user admin status"""
 
-    return user_service.change_admin_status(db, id, user_admin_status, request)
+    return await user_service.change_admin_status(db, id, user_admin_status, current_user)
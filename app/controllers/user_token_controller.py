@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.bearer import BearerAuth
+from app.commonhelper.fast_json import JSONRoute
 from app.domain.constants import USER_TOKENS_URL
 from app.domain.database import get_db
 from app.dtos.error_dtos import ErrorResponse, ValidationErrorResponse
@@ -11,7 +12,8 @@ from app.services import user_token_service
 
 controller = APIRouter(
     prefix=USER_TOKENS_URL,
-    tags=["User Tokens"]
+    tags=["User Tokens"],
+    route_class=JSONRoute
 )
 
 
@@ -19,6 +21,7 @@ controller = APIRouter(
     path="/verify",
     dependencies=[Depends(BearerAuth())],
     status_code=200,
+    response_model=bool,
     responses={
         200: {"model": bool},
         401: {"model": ErrorResponse},
@@ -27,8 +30,8 @@ controller = APIRouter(
 )
 async def verify_user_token(
     request: VerifyUserTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Verify user token"""
 
-    return user_token_service.verify_user_token(db, request)
+    return await user_token_service.verify_user_token(db, request)
@@ -3,3 +3,9 @@ import enum
 
 class UserTokenType(enum.Enum):
     RESET_PASSWORD = 1
+
+
+class LeaderboardPeriod(enum.Enum):
+    DAILY = 1
+    WEEKLY = 2
+    ALL_TIME = 3
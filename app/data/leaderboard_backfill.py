@@ -0,0 +1,74 @@
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.orm.session import Session
+from typing import Dict, List, Tuple
+
+from app.data.enums import LeaderboardPeriod
+from app.data.models import Game, UserBestScore
+from app.domain.database import SessionLocal
+from app.services.leaderboard_service import game_to_best_scores
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_user_best_scores(db: Session) -> int:
+    """Rebuild user_best_scores from the games table
+
+    Every existing row is deleted first, in the caller's transaction, so rows that are too high or
+    point at a stale game are replaced rather than kept. The migration that adds the table seeds it
+    on upgrade; this is for repairing it afterwards.
+
+    Games are streamed in creation order, so a day's (or week's) best scores are final as soon
+    as the stream moves past it; they are written out then, which keeps memory bounded by the
+    number of players rather than the number of games.
+    """
+
+    best_scores: Dict[Tuple, dict] = {}
+    current_period_starts = {}
+    written = 0
+
+    db.query(UserBestScore).delete(synchronize_session=False)
+
+    games = db.query(Game).order_by(Game.created_on, Game.id).yield_per(BATCH_SIZE)
+
+    for game in games:
+        for best_score in game_to_best_scores(game):
+            period = LeaderboardPeriod[best_score["period"]]
+
+            if current_period_starts.get(period) != best_score["period_start"]:
+                written += write_best_scores(db, pop_period(best_scores, period))
+                current_period_starts[period] = best_score["period_start"]
+
+            key = (best_score["user_id"], best_score["period"])
+
+            if key not in best_scores or best_scores[key]["best_score"] < best_score["best_score"]:
+                best_scores[key] = best_score
+
+    written += write_best_scores(db, list(best_scores.values()))
+
+    return written
+
+
+def pop_period(best_scores: Dict[Tuple, dict], period: LeaderboardPeriod) -> List[dict]:
+    keys = [key for key in best_scores if key[1] == period.name]
+    return [best_scores.pop(key) for key in keys]
+
+
+def write_best_scores(db: Session, best_scores: List[dict]) -> int:
+    for i in range(0, len(best_scores), BATCH_SIZE):
+        db.execute(insert(UserBestScore).values(best_scores[i:i + BATCH_SIZE]))
+
+    return len(best_scores)
+
+
+if __name__ == "__main__":
+    session = SessionLocal()
+
+    try:
+        logger.info("Backfilling user best scores...")
+        count = backfill_user_best_scores(session)
+        session.commit()
+        logger.info(f"Finished backfilling user best scores; {count} rows written")
+    finally:
+        session.close()
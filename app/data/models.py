@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, LargeBinary, String
 from sqlalchemy.orm import relationship
 
 from datetime import datetime
@@ -27,9 +27,11 @@ class User(BaseEntity):
     phone_number = Column(String, unique=True, nullable=True, index=True)
     password_hash = Column(LargeBinary, nullable=True)
     password_salt = Column(LargeBinary, nullable=True)
+    password_hash_format = Column(String, nullable=True)
     avatar = Column(Integer, nullable=True)
     is_admin = Column(Boolean, nullable=False, default=False)
     is_staff = Column(Boolean, nullable=False, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     games = relationship("Game", back_populates="user", cascade="all, delete-orphan")
 
 
@@ -43,6 +45,10 @@ class UserToken(BaseEntity):
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_user_tokens_user_id_token_type", "user_id", "token_type"),
+    )
+
 
 class Game(BaseEntity):
 
@@ -50,4 +56,36 @@ class Game(BaseEntity):
 
     score = Column(Integer, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    user = relationship("User", back_populates="games")
+    user = relationship("User", back_populates="games", lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_games_created_on_score", "created_on", "score"),
+        Index("ix_games_user_id_score", "user_id", score.desc(), "created_on"),
+    )
+
+
+class UserBestScore(Base):
+    """Best game per user and leaderboard period, maintained by game_service.create_game"""
+
+    __tablename__ = "user_best_scores"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    best_score = Column(Integer, nullable=False)
+    achieved_on = Column(DateTime, nullable=False)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=False)
+    user = relationship("User", lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_user_best_scores_ranking", "period", "period_start", best_score.desc(), "achieved_on"),
+    )
+
+
+class GameIngestionCheckpoint(Base):
+    """Last ingestion log sequence committed to games, written in the same transaction as the games"""
+
+    __tablename__ = "game_ingestion_checkpoints"
+
+    log_id = Column(String, primary_key=True)
+    sequence = Column(BigInteger, nullable=False)
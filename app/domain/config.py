@@ -10,11 +10,27 @@ load_dotenv()
 
 ENVIRONMENT = os.environ.get("ENVIRONMENT")
 SQLALCHEMY_DATABASE_URL = os.environ.get("SQLALCHEMY_DATABASE_URL")
+DATABASE_ASYNC = os.environ.get("DATABASE_ASYNC", "0") == "1"
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = float(os.environ.get("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", "-1"))
+DATABASE_POOL_PRE_PING = os.environ.get("DATABASE_POOL_PRE_PING", "0") == "1"
 SECRET_KEY = os.environ.get("SECRET_KEY")
 JWT_SIGNING_ALGORITHM = os.environ.get("JWT_SIGNING_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES"))
 LOG_LEVEL_CONFIG = os.environ.get("LOG_LEVEL_CONFIG", "DEBUG")
-JSON_LOGS_CONFIG = os.environ.get("JSON_LOGS_CONFIG", "0")
+JSON_LOGS_CONFIG = os.environ.get("JSON_LOGS_CONFIG", "0") == "1"
+ACCESS_LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_SUCCESS_SAMPLE_RATE", "1"))
+LOGGER_LEVELS_CONFIG = dict(
+    item.strip().split("=", 1)
+    for item in os.environ.get("LOGGER_LEVELS_CONFIG", "sqlalchemy.engine=WARNING,uvicorn.access=WARNING").split(",")
+    if item.strip()
+)
+SLOW_QUERY_LOG_MS = int(os.environ.get("SLOW_QUERY_LOG_MS", "250"))
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+REQUEST_TIMING = os.environ.get("REQUEST_TIMING", "1") == "1"
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "0") == "1"
 ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL")
 ADMIN_FIRST_NAME = os.environ.get("ADMIN_FIRST_NAME")
 ADMIN_LAST_NAME = os.environ.get("ADMIN_LAST_NAME")
@@ -22,6 +38,37 @@ ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
 USER_TOKEN_RESET_PASSWORD_EXPIRE_MINUTES = int(os.environ.get("USER_TOKEN_RESET_PASSWORD_EXPIRE_MINUTES"))
 USER_TOKEN_RESET_PASSWORD_LENGTH = int(os.environ.get("USER_TOKEN_RESET_PASSWORD_LENGTH"))
 ALL_TIME_LEADERBOARD_LIMIT = int(os.environ.get("ALL_TIME_LEADERBOARD_LIMIT"))
+DAILY_LEADERBOARD_LIMIT = int(os.environ.get("DAILY_LEADERBOARD_LIMIT", "100"))
+WEEKLY_LEADERBOARD_LIMIT = int(os.environ.get("WEEKLY_LEADERBOARD_LIMIT", "100"))
+GAME_BATCH_MAX_SIZE = int(os.environ.get("GAME_BATCH_MAX_SIZE", "100"))
+GAME_EXPORT_BATCH_SIZE = int(os.environ.get("GAME_EXPORT_BATCH_SIZE", "1000"))
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "500"))
+LEADERBOARD_SOURCE = os.environ.get("LEADERBOARD_SOURCE", "best_scores")
+LEADERBOARD_MEMORY_RESYNC_SECONDS = int(os.environ.get("LEADERBOARD_MEMORY_RESYNC_SECONDS", "0"))
+LEADERBOARD_VERSION_REFRESH_SECONDS = int(os.environ.get("LEADERBOARD_VERSION_REFRESH_SECONDS", "5"))
+LEADERBOARD_SNAPSHOT_SECONDS = int(os.environ.get("LEADERBOARD_SNAPSHOT_SECONDS", "0"))
+LEADERBOARD_SNAPSHOT_WRITES = int(os.environ.get("LEADERBOARD_SNAPSHOT_WRITES", "0"))
+LEADERBOARD_SNAPSHOT_MAX_STALENESS_SECONDS = int(os.environ.get("LEADERBOARD_SNAPSHOT_MAX_STALENESS_SECONDS", "60"))
+LEADERBOARD_CACHE_CONTROL = os.environ.get("LEADERBOARD_CACHE_CONTROL", "public, max-age=5")
+GAME_INGESTION_MODE = os.environ.get("GAME_INGESTION_MODE", "direct")
+GAME_INGESTION_QUEUE_SIZE = int(os.environ.get("GAME_INGESTION_QUEUE_SIZE", "10000"))
+GAME_INGESTION_BATCH_SIZE = int(os.environ.get("GAME_INGESTION_BATCH_SIZE", "500"))
+GAME_INGESTION_FLUSH_SECONDS = float(os.environ.get("GAME_INGESTION_FLUSH_SECONDS", "1"))
+GAME_INGESTION_LOG_PATH = os.environ.get("GAME_INGESTION_LOG_PATH")
+GAME_INGESTION_ACK = os.environ.get("GAME_INGESTION_ACK", "logged")
+STATELESS_JWT_VERIFICATION = os.environ.get("STATELESS_JWT_VERIFICATION", "0") == "1"
+TOKEN_REVOCATION_REFRESH_SECONDS = int(os.environ.get("TOKEN_REVOCATION_REFRESH_SECONDS", "30"))
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.environ.get("TOKEN_CACHE_TTL_SECONDS", "60"))
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASHING_QUEUE_SIZE", "64"))
+PASSWORD_HASH_ALGORITHM = os.environ.get("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", "100000"))
+PASSWORD_HASH_DKLEN = int(os.environ.get("PASSWORD_HASH_DKLEN", "32"))
+PASSWORD_HASH_SCRYPT_N = int(os.environ.get("PASSWORD_HASH_SCRYPT_N", "16384"))
+PASSWORD_HASH_SCRYPT_R = int(os.environ.get("PASSWORD_HASH_SCRYPT_R", "8"))
+PASSWORD_HASH_SCRYPT_P = int(os.environ.get("PASSWORD_HASH_SCRYPT_P", "1"))
 
 if ENVIRONMENT == "TEST":
     SQLALCHEMY_DATABASE_URL = TEST_DATABASE_URL
@@ -8,8 +8,12 @@ AUTH_URL = "/api/v1/auth"
 USERS_URL = "/api/v1/users"
 GAMES_URL = "/api/v1/games"
 USER_TOKENS_URL = "/api/v1/user-tokens"
+METRICS_URL = "/api/v1/metrics"
 
 FORGOT_PASSWORD_TEMPLATE = ""
 
+GAME_SCORE_MIN = -2 ** 31
+GAME_SCORE_MAX = 2 ** 31 - 1
+
 TEST_DATABASE_FILE = "./test.db"
 TEST_DATABASE_URL = f"sqlite:///{TEST_DATABASE_FILE}"
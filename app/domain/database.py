@@ -1,25 +1,247 @@
-from sqlalchemy import create_engine
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import CursorResult, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Union
+
+from app.commonhelper import prometheus_metrics
+from app.commonhelper.request_timing import request_timing
+
+from app.domain.config import DATABASE_ASYNC, DATABASE_MAX_OVERFLOW, DATABASE_POOL_PRE_PING, DATABASE_POOL_RECYCLE, \
+    DATABASE_POOL_SIZE, DATABASE_POOL_TIMEOUT, REQUEST_TIMING, SLOW_QUERY_LOG_MS, SQLALCHEMY_DATABASE_URL
+
+
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    url = make_url(database_url.replace("postgres://", "postgresql://", 1))
+    return str(url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)))
+
+
+class PoolStats:
+    """Checkout counters shared by every pool an engine creates, including after dispose()"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class InstrumentedPoolMixin:
+    """Time every checkout and count the ones that give up after pool_timeout"""
+
+    engine_name: str
+    stats: PoolStats
+
+    def connect(self):
+        started = time.perf_counter()
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            prometheus_metrics.DB_POOL_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            wait = time.perf_counter() - started
+
+            self.stats.checkouts += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+
+            prometheus_metrics.DB_POOL_CHECKOUTS.labels(self.engine_name).inc()
+            prometheus_metrics.DB_POOL_WAIT.labels(self.engine_name).observe(wait)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    engine_name = "sync"
+    stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    engine_name = "async"
+    stats = PoolStats()
+
+
+def get_engine_options(database_url: str) -> dict:
+    options = {
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": DATABASE_POOL_PRE_PING
+    }
+
+    if make_url(database_url).get_backend_name() == "sqlite":
+        # Sessions run on threadpool workers, so a connection may be used off the thread that opened it
+        options["connect_args"] = {"check_same_thread": False}
+
+    return options
+
+
+def log_slow_queries(engine: Engine, threshold_ms: int) -> None:
+    """Log statements that take at least threshold_ms, whatever the sqlalchemy.engine log level"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context.query_start_time = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - context.query_start_time) * 1000
+
+        if duration_ms >= threshold_ms:
+            logger.warning("Slow query {duration_ms:.1f}ms; {statement}", duration_ms=duration_ms, statement=statement)
+
+
+def track_checked_out_connections(engine: Engine, engine_name: str) -> None:
+    gauge = prometheus_metrics.DB_POOL_CHECKED_OUT.labels(engine_name)
+
+    @event.listens_for(engine, "checkout")
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        gauge.inc()
+
+    @event.listens_for(engine, "checkin")
+    def count_checkin(dbapi_connection, connection_record):
+        gauge.dec()
+
 
-from app.domain.config import ENVIRONMENT, SQLALCHEMY_DATABASE_URL
+def track_request_queries(engine: Engine) -> None:
+    """Add each statement to the current request's RequestTiming, when one is being timed
 
+    Threadpool workers and async drivers run with a copy of the request's context, so they update
+    the same timing object.
+    """
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_request_query_timer(conn, cursor, statement, parameters, context, executemany):
+        context.request_query_start_time = time.perf_counter()
 
-if ENVIRONMENT == "TEST":
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_request_query(conn, cursor, statement, parameters, context, executemany):
+        timing = request_timing.get()
+
+        if timing:
+            timing.queries += 1
+            timing.db += time.perf_counter() - context.request_query_start_time
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **get_engine_options(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC:
+    async_database_url = get_async_database_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(async_database_url, poolclass=InstrumentedAsyncQueuePool, **get_engine_options(async_database_url))
+    AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+track_checked_out_connections(engine, InstrumentedQueuePool.engine_name)
+
+if async_engine:
+    track_checked_out_connections(async_engine.sync_engine, InstrumentedAsyncQueuePool.engine_name)
+
+if REQUEST_TIMING:
+    track_request_queries(engine)
+
+    if async_engine:
+        track_request_queries(async_engine.sync_engine)
+
+if SLOW_QUERY_LOG_MS > 0:
+    log_slow_queries(engine, SLOW_QUERY_LOG_MS)
+
+    if async_engine:
+        log_slow_queries(async_engine.sync_engine, SLOW_QUERY_LOG_MS)
+
+
+class ThreadedSession:
+    """Awaitable facade over a synchronous Session, mirroring the AsyncSession API
+
+    Each database call runs in the threadpool so the sync driver never blocks the event loop.
+    """
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.buffered_execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalar()
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    def buffered_execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+
+        if isinstance(result, CursorResult) and not result.returns_rows:
+            return result
+
+        # Fetch rows on the worker thread, matching the buffered results AsyncSession returns
+        return result.freeze()()
+
+
+AppSession = Union[AsyncSession, ThreadedSession]
+
+
+def create_session() -> AppSession:
+    if DATABASE_ASYNC:
+        return AsyncSessionLocal()
+
+    return ThreadedSession(SessionLocal(expire_on_commit=False))
+
 
-def get_db():
+async def get_db():
     """Provide db session to path operation functions"""
 
-    db = SessionLocal()
+    db = create_session()
 
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
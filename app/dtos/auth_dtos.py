@@ -61,6 +61,19 @@ class ResetPasswordRequest(BaseModel):
 class PasswordDto(BaseModel):
     password_hash: bytes
     password_salt: bytes
+    password_hash_format: Optional[str]
+
+
+class Principal(BaseModel):
+    id: int
+    username: str
+    email: Optional[str]
+    phone_number: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    avatar: Optional[int]
+    is_admin: bool = False
+    is_staff: bool = False
 
 
 class AccessTokenResponse(BaseModel):
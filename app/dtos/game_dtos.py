@@ -1,9 +1,14 @@
+import enum
+
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, conint, conlist
+
+from app.domain.config import GAME_BATCH_MAX_SIZE
+from app.domain.constants import GAME_SCORE_MAX, GAME_SCORE_MIN
 
 
 class GameResponse(BaseModel):
-    id: int
+    id: Optional[int]
     score: int
     username: str
     first_name: Optional[str]
@@ -12,4 +17,13 @@ class GameResponse(BaseModel):
 
 
 class GameCreateRequest(BaseModel):
-    score: int
+    score: conint(ge=GAME_SCORE_MIN, le=GAME_SCORE_MAX)
+
+
+class GameBatchCreateRequest(BaseModel):
+    games: conlist(GameCreateRequest, min_items=1, max_items=GAME_BATCH_MAX_SIZE)
+
+
+class GameExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+
+
+class PasswordHashingMetricsResponse(BaseModel):
+    workers: int
+    queue_size: int
+    in_flight: int
+    queue_depth: int
+    completed: int
+    failed: int
+    cancelled: int
+    rejected: int
+    average_latency_ms: float
+    max_latency_ms: float
+
+
+class TokenCacheMetricsResponse(BaseModel):
+    size: int
+    max_size: int
+    ttl_seconds: int
+    hits: int
+    misses: int
+
+
+class DatabasePoolMetricsResponse(BaseModel):
+    engine: str
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    average_wait_ms: float
+    max_wait_ms: float
+
+
+class SingleFlightMetricsResponse(BaseModel):
+    name: str
+    calls: int
+    executions: int
+    coalesced: int
+    in_flight: int
@@ -43,6 +43,13 @@ class NotFoundException(AppDomainException):
         super().__init__(status_code, code, message)
 
 
+class ServiceUnavailableException(AppDomainException):
+    def __init__(self, message: str):
+        status_code = 503
+        code = "ServiceUnavailable"
+        super().__init__(status_code, code, message)
+
+
 class SystemErrorException(AppDomainException):
     def __init__(self, message: str = None):
         status_code = 500
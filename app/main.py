@@ -1,3 +1,5 @@
+import os
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,20 +7,29 @@ from fastapi.responses import RedirectResponse
 from logging.config import fileConfig as configure_logging
 from loguru import logger
 
+from app.auth import token_cache, token_revocation
+from app.commonhelper import prometheus_metrics
+from app.config.loguru_logging import apply_logger_levels, setup_loguru_sink
 from app.config.loguru_logging_intercept import setup_loguru_logging_intercept
 from app.controllers.auth_controller import controller as auth_controller
 from app.controllers.user_controller import controller as user_controller
 from app.controllers.user_token_controller import controller as user_token_controller
 from app.controllers.game_controller import controller as game_controller
+from app.controllers.metrics_controller import controller as metrics_controller
 from app.data.migrations_manager import migrate_database
-from app.domain.config import ENVIRONMENT, SQLALCHEMY_DATABASE_URL
+from app.domain.config import ENVIRONMENT, LOGGER_LEVELS_CONFIG, SQLALCHEMY_DATABASE_URL, STATELESS_JWT_VERIFICATION
 from app.domain.constants import ALEMBIC_INI_DIR, LOGGING_CONFIG_DIR, DOCS_URL, MIGRATIONS_DIR, OPEN_API_URL
 from app.exceptions.app_exceptions import AppDomainException
 from app.exceptions.handlers import exception_handler, app_exception_handler, validation_exception_handler
-from app.middleware.handlers import http_logging_middleware
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.request_metrics import RequestMetricsMiddleware
+from app.middleware.request_timing import RequestTimingMiddleware
+from app.services import game_ingestion_service, leaderboard_service, password_hashing_service
 
 
+setup_loguru_sink()
 configure_logging(LOGGING_CONFIG_DIR, disable_existing_loggers=False)
+apply_logger_levels(LOGGER_LEVELS_CONFIG)
 setup_loguru_logging_intercept(
     modules=(
         "uvicorn", "uvicorn.access", "uvicorn.error", "alembic", "sqlalchemy.engine"
@@ -44,6 +55,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(AccessLogMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(RequestTimingMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -61,15 +75,78 @@ async def custom_exception_handler(request: Request, e: Exception):
     return await exception_handler(request, e)
 
 
-@app.middleware("http")
-async def custom_http_logging_middleware(request: Request, call_next):
-    return await http_logging_middleware(request, call_next)
-
-
 app.include_router(auth_controller)
 app.include_router(user_controller)
 app.include_router(user_token_controller)
 app.include_router(game_controller)
+app.include_router(metrics_controller)
+
+
+@app.on_event("startup")
+async def start_token_revocation_refresh():
+    # Cached tokens skip the user lookup too, so revocations from other workers must reach this one
+    if STATELESS_JWT_VERIFICATION or token_cache.is_enabled():
+        await token_revocation.start()
+
+
+@app.on_event("startup")
+async def start_memory_leaderboards():
+    await leaderboard_service.start_memory_leaderboards()
+
+
+@app.on_event("startup")
+async def start_leaderboard_snapshot_refresh():
+    await leaderboard_service.start_snapshot_refresh()
+
+
+@app.on_event("startup")
+async def start_leaderboard_version_refresh():
+    await leaderboard_service.start_version_refresh()
+
+
+@app.on_event("startup")
+async def start_game_ingestion():
+    await game_ingestion_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_game_ingestion():
+    await game_ingestion_service.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_token_revocation_refresh():
+    token_revocation.stop()
+
+
+@app.on_event("shutdown")
+def stop_memory_leaderboards():
+    leaderboard_service.stop_memory_leaderboards()
+
+
+@app.on_event("shutdown")
+def stop_leaderboard_snapshot_refresh():
+    leaderboard_service.stop_snapshot_refresh()
+
+
+@app.on_event("shutdown")
+def stop_leaderboard_version_refresh():
+    leaderboard_service.stop_version_refresh()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hashing_pool():
+    password_hashing_service.shutdown()
+
+
+@app.on_event("shutdown")
+def mark_metrics_process_dead():
+    prometheus_metrics.mark_process_dead(os.getpid())
+
+
+@app.on_event("shutdown")
+async def flush_logs():
+    await logger.complete()
 
 
 @app.get("/", include_in_schema=False)
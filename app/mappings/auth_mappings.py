@@ -1,5 +1,5 @@
 from app.data.models import User
-from app.dtos.auth_dtos import ExternalLoginRequest
+from app.dtos.auth_dtos import ExternalLoginRequest, Principal
 
 
 def external_login_to_user(external_login: ExternalLoginRequest) -> User:
@@ -15,3 +15,45 @@ def external_login_to_user(external_login: ExternalLoginRequest) -> User:
     )
 
     return result
+
+
+def user_to_principal(user: User) -> Principal:
+
+    result = Principal(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        phone_number=user.phone_number,
+        first_name=user.fname,
+        last_name=user.lname,
+        avatar=user.avatar,
+        is_admin=user.is_admin,
+        is_staff=user.is_staff
+    )
+
+    return result
+
+
+def user_to_token_claims(user: User) -> dict:
+
+    result = {
+        "sub": user.username,
+        "uid": user.id,
+        "ver": user.token_version or 0,
+        "adm": user.is_admin,
+        "stf": user.is_staff
+    }
+
+    return result
+
+
+def token_claims_to_principal(claims: dict) -> Principal:
+
+    result = Principal(
+        id=claims["uid"],
+        username=claims["sub"],
+        is_admin=claims["adm"],
+        is_staff=claims["stf"]
+    )
+
+    return result
@@ -1,10 +1,14 @@
-from app.data.models import Game
+from typing import Optional
+
+from app.commonhelper.ranked_leaderboard import LeaderboardEntry
+from app.data.models import Game, User, UserBestScore
+from app.dtos.auth_dtos import Principal
 from app.dtos.game_dtos import GameCreateRequest, GameResponse
 
 
 def game_to_game_response(game: Game) -> GameResponse:
 
-    result = GameResponse(
+    result = GameResponse.construct(
         id=game.id,
         score=game.score,
         username=game.user.username,
@@ -16,6 +20,68 @@ def game_to_game_response(game: Game) -> GameResponse:
     return result
 
 
+def user_game_to_game_response(game: Game, user: User) -> GameResponse:
+
+    result = GameResponse.construct(
+        id=game.id,
+        score=game.score,
+        username=user.username,
+        first_name=user.fname,
+        last_name=user.lname,
+        avatar=user.avatar
+    )
+
+    return result
+
+
+def user_best_score_to_game_response(best_score: UserBestScore) -> GameResponse:
+
+    result = GameResponse.construct(
+        id=best_score.game_id,
+        score=best_score.best_score,
+        username=best_score.user.username,
+        first_name=best_score.user.fname,
+        last_name=best_score.user.lname,
+        avatar=best_score.user.avatar
+    )
+
+    return result
+
+
+def leaderboard_entry_to_game_response(entry: LeaderboardEntry, user: User) -> GameResponse:
+
+    result = GameResponse.construct(
+        id=get_committed_game_id(entry),
+        score=entry.score,
+        username=user.username,
+        first_name=user.fname,
+        last_name=user.lname,
+        avatar=user.avatar
+    )
+
+    return result
+
+
+def pending_game_to_game_response(entry: LeaderboardEntry, principal: Principal) -> GameResponse:
+
+    result = GameResponse.construct(
+        id=get_committed_game_id(entry),
+        score=entry.score,
+        username=principal.username,
+        first_name=principal.first_name,
+        last_name=principal.last_name,
+        avatar=principal.avatar
+    )
+
+    return result
+
+
+def get_committed_game_id(entry: LeaderboardEntry) -> Optional[int]:
+    """Buffered games carry provisional negative ids until they are flushed"""
+
+    return entry.game_id if entry.game_id > 0 else None
+
+
 def game_create_to_game(game_create: GameCreateRequest) -> Game:
 
     result = Game(
@@ -1,11 +1,11 @@
 from app.data.models import User
+from app.dtos.auth_dtos import PasswordDto, Principal
 from app.dtos.user_dtos import UserResponse, UserCreateRequest
-from app.commonhelper import utils
 
 
 def user_to_user_response(user: User) -> UserResponse:
 
-    result = UserResponse(
+    result = UserResponse.construct(
         id=user.id,
         username=user.username,
         email=user.email,
@@ -20,9 +20,24 @@ def user_to_user_response(user: User) -> UserResponse:
     return result
 
 
-def user_create_to_user(user_create: UserCreateRequest) -> User:
+def principal_to_user_response(principal: Principal) -> UserResponse:
 
-    password_hash, password_salt = utils.generate_hash_and_salt(user_create.password)
+    result = UserResponse.construct(
+        id=principal.id,
+        username=principal.username,
+        email=principal.email,
+        phone_number=principal.phone_number,
+        first_name=principal.first_name,
+        last_name=principal.last_name,
+        avatar=principal.avatar,
+        is_admin=principal.is_admin,
+        is_staff=principal.is_staff
+    )
+
+    return result
+
+
+def user_create_to_user(user_create: UserCreateRequest, password: PasswordDto) -> User:
 
     result = User(
         username=user_create.email,
@@ -30,8 +45,9 @@ def user_create_to_user(user_create: UserCreateRequest) -> User:
         phone_number=user_create.phone_number,
         fname=user_create.first_name,
         lname=user_create.last_name,
-        password_hash=password_hash,
-        password_salt=password_salt
+        password_hash=password.password_hash,
+        password_salt=password.password_salt,
+        password_hash_format=password.password_hash_format
     )
 
     return result
@@ -0,0 +1,66 @@
+import random
+import time
+
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.commonhelper.request_timing import request_timing
+from app.domain.config import ACCESS_LOG_SUCCESS_SAMPLE_RATE
+
+
+class AccessLogMiddleware:
+    """Pure ASGI middleware logging one structured record per HTTP request
+
+    Unlike @app.middleware("http"), it adds no task or memory stream per request and passes
+    streamed bodies straight through. 2xx responses are logged at ACCESS_LOG_SUCCESS_SAMPLE_RATE;
+    everything else is always logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter_ns()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if not 200 <= status_code < 300 or random.random() < ACCESS_LOG_SUCCESS_SAMPLE_RATE:
+                log_request(scope, status_code, (time.perf_counter_ns() - start_time) / 1e6)
+
+
+def log_request(scope: Scope, status_code: int, duration_ms: float) -> None:
+    client = scope.get("client")
+    timing = request_timing.get()
+    phases = {}
+
+    if timing:
+        phases = {
+            "db_queries": timing.queries,
+            "db_ms": timing.db * 1000,
+            "auth_ms": timing.auth * 1000,
+            "serialize_ms": timing.serialize * 1000
+        }
+
+    logger.info(
+        "{method} {path} {status_code} {duration_ms:.2f}ms",
+        method=scope["method"],
+        path=scope["path"],
+        status_code=status_code,
+        duration_ms=duration_ms,
+        client=client[0] if client else None,
+        **phases
+    )
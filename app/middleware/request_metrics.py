@@ -0,0 +1,66 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Callable, Dict, Optional
+
+from app.commonhelper import prometheus_metrics
+from app.commonhelper.request_timing import request_timing
+
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware recording Prometheus request metrics, with database time from the request's timing
+
+    Routes are labelled by their path template, so path parameters do not multiply series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.route_paths: Optional[Dict[Callable, str]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = prometheus_metrics.HTTP_REQUESTS_IN_PROGRESS.labels(method)
+
+        in_progress.inc()
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start_time
+
+            in_progress.dec()
+
+            route = self.get_route(scope)
+
+            prometheus_metrics.HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            prometheus_metrics.HTTP_REQUEST_DURATION.labels(method, route).observe(duration)
+            timing = request_timing.get()
+
+            if timing:
+                prometheus_metrics.DB_QUERIES.labels(route).inc(timing.queries)
+                prometheus_metrics.DB_QUERY_DURATION.labels(route).inc(timing.db)
+
+    def get_route(self, scope: Scope) -> str:
+        """The router stores the matched endpoint in the shared scope; map it back to its path"""
+
+        if self.route_paths is None:
+            self.route_paths = {route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")}
+
+        return self.route_paths.get(scope.get("endpoint"), UNMATCHED_ROUTE)
@@ -0,0 +1,40 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.commonhelper.request_timing import RequestTiming, request_timing
+from app.domain.config import REQUEST_TIMING
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware timing each request's phases and reporting them in a Server-Timing header
+
+    It must be the outermost middleware, so the access log and metrics middlewares see its timing.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not REQUEST_TIMING:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = request_timing.set(timing)
+
+        async def send_with_server_timing(message: Message) -> None:
+
+            if message["type"] == "http.response.start":
+                if timing.endpoint_finished is not None:
+                    timing.serialize = time.perf_counter() - timing.endpoint_finished
+
+                MutableHeaders(scope=message).append("Server-Timing", timing.get_server_timing())
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            request_timing.reset(token)
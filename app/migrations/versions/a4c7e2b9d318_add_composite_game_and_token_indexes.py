@@ -0,0 +1,32 @@
+"""Add composite game and user token indexes
+
+Revision ID: a4c7e2b9d318
+Revises: 5d9a0e4c7f21
+Create Date: 2026-10-18 21:04:37.118254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2b9d318'
+down_revision = '5d9a0e4c7f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PostgreSQL builds the indexes with CREATE INDEX CONCURRENTLY so writes to games and
+    # user_tokens are not blocked; that statement cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_games_created_on_score', 'games', ['created_on', 'score'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_games_user_id_score', 'games', ['user_id', sa.text('score DESC'), 'created_on'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_user_tokens_user_id_token_type', 'user_tokens', ['user_id', 'token_type'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_tokens_user_id_token_type', table_name='user_tokens', postgresql_concurrently=True)
+        op.drop_index('ix_games_user_id_score', table_name='games', postgresql_concurrently=True)
+        op.drop_index('ix_games_created_on_score', table_name='games', postgresql_concurrently=True)
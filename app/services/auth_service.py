@@ -1,64 +1,67 @@
-import hashlib
 import string
 import jwt
 import time
 
 from datetime import datetime, timedelta
-from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
+from app.auth import token_cache, token_revocation
 from app.commonhelper import utils
 from app.data.enums import UserTokenType
+from app.data.models import User
 from app.domain.config import USER_TOKEN_RESET_PASSWORD_EXPIRE_MINUTES, USER_TOKEN_RESET_PASSWORD_LENGTH, \
-    ACCESS_TOKEN_EXPIRE_MINUTES, JWT_SIGNING_ALGORITHM, SECRET_KEY
+    ACCESS_TOKEN_EXPIRE_MINUTES, JWT_SIGNING_ALGORITHM, SECRET_KEY, STATELESS_JWT_VERIFICATION
 from app.domain.constants import FORGOT_PASSWORD_TEMPLATE
-from app.dtos.auth_dtos import ForgotPasswordRequest, PasswordDto, ResetPasswordRequest, LoginRequest, AccessTokenResponse, ExternalLoginRequest
+from app.dtos.auth_dtos import ForgotPasswordRequest, PasswordDto, Principal, ResetPasswordRequest, LoginRequest, AccessTokenResponse, \
+    ExternalLoginRequest
 from app.dtos.user_dtos import UserResponse
 from app.exceptions.app_exceptions import UnauthorizedRequestException, NotFoundException
+from app.mappings.auth_mappings import token_claims_to_principal, user_to_principal, user_to_token_claims
 from app.mappings.user_mappings import user_to_user_response
-from app.services import email_service, user_service, user_token_service
+from app.services import email_service, password_hashing_service, user_service, user_token_service
 
 
-def get_user_password(db: Session, username: str) -> PasswordDto:
+def get_user_password(user: User) -> PasswordDto:
 
-    user = user_service.get_user_by_username(db, username)
+    if not user.password_hash:
+        return None
 
     response = PasswordDto(
         password_hash=user.password_hash,
-        password_salt=user.password_salt
+        password_salt=user.password_salt,
+        password_hash_format=user.password_hash_format
     )
 
     return response
 
 
-def verify_password(password, password_hash, password_salt) -> bool:
-    key = hashlib.pbkdf2_hmac(
-        "sha256",
-        password.encode("utf-8"),
-        password_salt,
-        100000,
-        dklen=128
-    )
-
-    return key == password_hash
+async def verify_password(password: str, stored_password: PasswordDto) -> bool:
+    return await password_hashing_service.verify_password(password, stored_password)
 
 
-def authenticate_user(db: Session, username: str, password: str) -> bool:
-    user_password = get_user_password(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    user = await user_service.get_user_by_username(db, username)
+    user_password = get_user_password(user)
 
     if not user_password:
-        return False
+        return None
 
-    if not verify_password(password, user_password.password_hash, user_password.password_salt):
-        return False
+    if not await verify_password(password, user_password):
+        return None
 
-    return True
+    if utils.password_needs_rehash(user_password.password_hash_format):
+        user_service.set_user_password(user, await password_hashing_service.hash_password(password))
+        await db.commit()
+
+    return user
 
 
-def forgot_password(db: Session, forgot_password_data: ForgotPasswordRequest) -> None:
-    user = user_service.get_user_by_username(db, forgot_password_data.username)
+async def forgot_password(db: AsyncSession, forgot_password_data: ForgotPasswordRequest) -> None:
+    user = await user_service.get_user_by_username(db, forgot_password_data.username)
 
-    user_token = user_token_service.generate_token(db, USER_TOKEN_RESET_PASSWORD_LENGTH, string.ascii_letters,
-                                                   USER_TOKEN_RESET_PASSWORD_EXPIRE_MINUTES, UserTokenType.RESET_PASSWORD, user.id)
+    user_token = await user_token_service.generate_token(db, USER_TOKEN_RESET_PASSWORD_LENGTH, string.ascii_letters,
+                                                         USER_TOKEN_RESET_PASSWORD_EXPIRE_MINUTES, UserTokenType.RESET_PASSWORD, user.id)
 
     payload = {
         "token": user_token.token
@@ -67,61 +70,61 @@ def forgot_password(db: Session, forgot_password_data: ForgotPasswordRequest) ->
     email_service.send_email(user.email, FORGOT_PASSWORD_TEMPLATE, payload)
 
 
-def reset_password(db: Session, reset_password_data: ResetPasswordRequest) -> UserResponse:
-    user = user_service.get_user_by_username(db, reset_password_data.username)
+async def reset_password(db: AsyncSession, reset_password_data: ResetPasswordRequest) -> UserResponse:
+    user = await user_service.get_user_by_username(db, reset_password_data.username)
 
-    user_token_service.use_token(db, user.id, reset_password_data.token, UserTokenType.RESET_PASSWORD)
+    await user_token_service.use_token(db, user.id, reset_password_data.token, UserTokenType.RESET_PASSWORD)
 
-    password_hash, password_salt = utils.generate_hash_and_salt(reset_password_data.password)
+    password = await password_hashing_service.hash_password(reset_password_data.password)
 
-    user.password_hash = password_hash
-    user.password_salt = password_salt
+    user_service.set_user_password(user, password)
+    user_service.bump_token_version(user)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    token_revocation.revoke(user.id, user.token_version)
+    token_cache.evict_user(user.id)
 
     return user_to_user_response(user)
 
 
-def get_access_token(db: Session, login_data: LoginRequest) -> AccessTokenResponse:
+async def get_access_token(db: AsyncSession, login_data: LoginRequest) -> AccessTokenResponse:
+
+    user = await authenticate_user(db, login_data.username, login_data.password)
 
-    if not authenticate_user(db, login_data.username, login_data.password):
+    if not user:
         raise UnauthorizedRequestException("Incorrect username or password")
 
     expire = get_expiry(login_data.expires)
 
-    data = {"sub": login_data.username, "exp": expire}
+    data = {**user_to_token_claims(user), "exp": expire}
     return generate_access_token(data)
 
 
-def get_access_token_for_external_login(db: Session, external_login_data: ExternalLoginRequest) -> AccessTokenResponse:
+async def get_access_token_for_external_login(db: AsyncSession, external_login_data: ExternalLoginRequest) -> AccessTokenResponse:
 
     username = external_login_data.email if external_login_data.email else external_login_data.phone_number
 
     try:
-        user_service.get_user_by_username(db, username)
+        user = await user_service.get_user_by_username(db, username)
     except NotFoundException:
-        user_service.create_social_user(db, external_login_data)
+        user = await user_service.create_social_user(db, external_login_data)
 
     expire = get_expiry(external_login_data.expires)
 
-    data = {"sub": username, "exp": expire}
+    data = {**user_to_token_claims(user), "exp": expire}
     return generate_access_token(data)
 
 
-def decode_jwt(db: Session, token: str) -> dict:
+def decode_jwt(token: str) -> dict:
 
     try:
         decoded_token = jwt.decode(token, SECRET_KEY, algorithms=[JWT_SIGNING_ALGORITHM])
     except jwt.PyJWTError:
         return {}
 
-    username = decoded_token.get("sub")
-    if not username:
-        return {}
-
-    user = user_service.get_user_by_username(db, username)
-    if not user:
+    if not decoded_token.get("sub"):
         return {}
 
     expiry = decoded_token.get("exp")
@@ -132,9 +135,54 @@ def decode_jwt(db: Session, token: str) -> dict:
     return decoded_token
 
 
-def verify_jwt(db: Session, token: str) -> bool:
+async def get_principal(db: AsyncSession, token: str) -> Optional[Principal]:
+
+    cached_token = token_cache.get(token)
+    if cached_token:
+        if token_revocation.is_revoked(cached_token.principal.id, cached_token.token_version):
+            return None
+
+        return cached_token.principal
+
+    decoded_token = decode_jwt(token)
+    if not decoded_token:
+        return None
+
+    principal = await resolve_principal(db, decoded_token)
+    if principal:
+        token_cache.put(token, principal, decoded_token.get("ver", 0), decoded_token["exp"])
+
+    return principal
+
+
+async def resolve_principal(db: AsyncSession, decoded_token: dict) -> Optional[Principal]:
+
+    if STATELESS_JWT_VERIFICATION and is_stateless_token(decoded_token):
+        if token_revocation.is_revoked(decoded_token["uid"], decoded_token["ver"]):
+            return None
+
+        return token_claims_to_principal(decoded_token)
+
+    try:
+        user = await user_service.get_user_by_username(db, decoded_token.get("sub"))
+    except NotFoundException:
+        return None
+
+    if decoded_token.get("ver", 0) < user.token_version:
+        return None
+
+    return user_to_principal(user)
+
+
+def is_stateless_token(decoded_token: dict) -> bool:
+    """Tokens issued before token versioning lack the claims needed to skip the user lookup"""
+
+    return all(claim in decoded_token for claim in ("uid", "ver", "adm", "stf"))
+
+
+async def verify_jwt(db: AsyncSession, token: str) -> bool:
 
-    if not decode_jwt(db, token):
+    if not await get_principal(db, token):
         return False
 
     return True
@@ -0,0 +1,469 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import uuid
+
+from collections import deque
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+from sqlalchemy import update
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from typing import Deque, IO, List, Optional, Tuple
+
+from app.commonhelper.ranked_leaderboard import LeaderboardEntry
+from app.data.models import Game, GameIngestionCheckpoint
+from app.domain.config import GAME_INGESTION_ACK, GAME_INGESTION_BATCH_SIZE, GAME_INGESTION_FLUSH_SECONDS, \
+    GAME_INGESTION_LOG_PATH, GAME_INGESTION_MODE, GAME_INGESTION_QUEUE_SIZE
+from app.domain.database import SessionLocal, create_session
+from app.dtos.auth_dtos import Principal
+from app.dtos.game_dtos import GameCreateRequest, GameResponse
+from app.exceptions.app_exceptions import BadRequestException, ServiceUnavailableException
+from app.mappings.game_mappings import pending_game_to_game_response
+from app.services import game_service, leaderboard_service
+
+
+class PendingGame:
+    """A game accepted into the buffer; its entry carries the negated log sequence as a provisional id"""
+
+    __slots__ = ("entry", "committed")
+
+    def __init__(self, entry: LeaderboardEntry, committed: Optional[asyncio.Future] = None):
+        self.entry = entry
+        self.committed = committed
+
+    @property
+    def sequence(self) -> int:
+        return -self.entry.game_id
+
+
+class GameIngestionState:
+    """Bounded buffer of accepted games, flushed to the database in batches
+
+    Every accepted game is appended to the ingestion log before it is buffered. Flushed batches are
+    checkpointed in the log, and the log is truncated whenever the buffer drains, so a restart only
+    replays games that were never committed. Each batch also records its last sequence against the
+    log's id in game_ingestion_checkpoints, in the same transaction, so a replay skips games that were
+    committed but not yet checkpointed in the log.
+
+    The log is locked by the process that opens it, so buffered ingestion with a log runs a single
+    worker; a second process started on the same GAME_INGESTION_LOG_PATH refuses to start.
+    """
+
+    def __init__(self):
+        self.queue: Deque[PendingGame] = deque()
+        self.sequence = itertools.count(1)
+        self.log: Optional[IO[str]] = None
+        self.log_id: Optional[str] = None
+        self.log_lock = threading.Lock()
+        self.last_logged = 0
+        self.checkpoint_loaded = False
+        self.flush_lock: Optional[asyncio.Lock] = None
+        self.flush_requested: Optional[asyncio.Event] = None
+        self.flush_task: Optional[asyncio.Task] = None
+        self.stopping = False
+
+
+state = GameIngestionState()
+
+
+def is_buffered() -> bool:
+    return GAME_INGESTION_MODE == "buffered"
+
+
+async def enqueue(current_user: Principal, game_data: GameCreateRequest) -> GameResponse:
+    """Accept a game into the buffer, acknowledging it as configured by GAME_INGESTION_ACK
+
+    queued acknowledges once the game is buffered, logged once its log record is fsync'd and
+    committed once the batch containing it is committed.
+    """
+
+    if len(state.queue) >= GAME_INGESTION_QUEUE_SIZE:
+        raise ServiceUnavailableException("Game ingestion buffer is full, please try again shortly")
+
+    # Sequence, log record and buffer slot are taken without yielding, so the log, the buffer and
+    # the sequence always agree on order and every flushed batch is a contiguous run of sequences
+    entry = LeaderboardEntry(current_user.id, -next(state.sequence), game_data.score, datetime.utcnow())
+
+    if GAME_INGESTION_LOG_PATH:
+        write_to_log([get_log_record(entry)])
+
+    pending = PendingGame(entry)
+
+    if GAME_INGESTION_ACK == "committed":
+        pending.committed = asyncio.get_running_loop().create_future()
+
+    buffer(pending)
+
+    if GAME_INGESTION_LOG_PATH and GAME_INGESTION_ACK == "logged":
+        await run_in_threadpool(sync_log)
+
+    if pending.committed:
+        entry = await asyncio.shield(pending.committed)
+
+    return pending_game_to_game_response(entry, current_user)
+
+
+def buffer(pending: PendingGame) -> None:
+    state.queue.append(pending)
+    leaderboard_service.add_pending_game(pending.entry)
+
+    if len(state.queue) >= GAME_INGESTION_BATCH_SIZE and state.flush_requested:
+        state.flush_requested.set()
+
+
+async def flush() -> None:
+    """Write buffered games to the database until the buffer is empty
+
+    Raises when the database cannot be reached, leaving the remaining games buffered for the next flush.
+    """
+
+    if not state.flush_lock:
+        state.flush_lock = asyncio.Lock()
+
+    async with state.flush_lock:
+        if state.log_id and not state.checkpoint_loaded:
+            await skip_committed()
+
+        while state.queue:
+            await flush_batch(list(itertools.islice(state.queue, GAME_INGESTION_BATCH_SIZE)))
+
+
+async def flush_batch(batch: List[PendingGame]) -> None:
+    """Commit a batch from the head of the buffer, splitting it to set aside games the database refuses"""
+
+    try:
+        games, ranking_changed = await write_batch(batch)
+    except Exception as e:
+        if is_transient_error(e):
+            raise
+
+        if len(batch) == 1:
+            await reject(batch[0], e)
+            return
+
+        middle = len(batch) // 2
+
+        await flush_batch(batch[:middle])
+        await flush_batch(batch[middle:])
+        return
+
+    for _ in batch:
+        state.queue.popleft()
+
+    leaderboard_service.remove_pending_games([pending.entry.game_id for pending in batch])
+
+    for game in games:
+        leaderboard_service.update_memory_leaderboards(game)
+
+    leaderboard_service.bump_versions()
+
+    if ranking_changed:
+        leaderboard_service.record_snapshot_write()
+
+    for pending, game in zip(batch, games):
+        if pending.committed and not pending.committed.done():
+            pending.committed.set_result(LeaderboardEntry(game.user_id, game.id, game.score, game.created_on))
+
+    if GAME_INGESTION_LOG_PATH:
+        await run_in_threadpool(checkpoint_log, batch[-1].sequence)
+
+
+async def write_batch(batch: List[PendingGame]) -> Tuple[List[Game], bool]:
+    games = [
+        Game(user_id=pending.entry.user_id, score=pending.entry.score, created_on=pending.entry.created_on, is_deleted=False)
+        for pending in batch
+    ]
+
+    db = create_session()
+
+    try:
+        for game, game_id in zip(games, await game_service.insert_games(db, games)):
+            game.id = game_id
+
+        ranking_changed = await leaderboard_service.upsert_best_scores(db, leaderboard_service.games_to_best_scores(games))
+
+        if state.log_id:
+            await db.execute(
+                update(GameIngestionCheckpoint)
+                .where(GameIngestionCheckpoint.log_id == state.log_id)
+                .values(sequence=batch[-1].sequence)
+            )
+
+        await db.commit()
+    finally:
+        await db.close()
+
+    return games, ranking_changed
+
+
+def is_transient_error(e: Exception) -> bool:
+    """Connection, lock and pool errors fail every batch alike, so splitting the batch would not help"""
+
+    return isinstance(e, (OperationalError, InterfaceError, PoolTimeoutError, OSError)) or getattr(e, "connection_invalidated", False)
+
+
+async def reject(pending: PendingGame, e: Exception) -> None:
+    """Set the game at the head of the buffer aside so it no longer holds up the games behind it"""
+
+    record = get_log_record(pending.entry)
+    logger.error(f"Rejected buffered game the database refused; {json.dumps(record)}; {e}")
+
+    state.queue.popleft()
+    leaderboard_service.remove_pending_games([pending.entry.game_id])
+    leaderboard_service.bump_versions()
+
+    if pending.committed and not pending.committed.done():
+        pending.committed.set_exception(BadRequestException("Game could not be stored"))
+
+    if GAME_INGESTION_LOG_PATH:
+        await run_in_threadpool(append_to_rejected_log, record)
+        await run_in_threadpool(checkpoint_log, pending.sequence)
+
+
+async def skip_committed() -> None:
+    """Drop replayed games that a previous process committed but never checkpointed in the log"""
+
+    committed = await run_in_threadpool(load_checkpoint, state.log_id)
+    skipped = []
+
+    while state.queue and state.queue[0].sequence <= committed:
+        skipped.append(state.queue.popleft())
+
+    state.checkpoint_loaded = True
+
+    if skipped:
+        leaderboard_service.remove_pending_games([pending.entry.game_id for pending in skipped])
+        leaderboard_service.bump_versions()
+
+        logger.info(f"Skipped replayed games that were already committed; {len(skipped)} games")
+
+        await run_in_threadpool(checkpoint_log, skipped[-1].sequence)
+
+
+def load_checkpoint(log_id: str) -> int:
+    db = SessionLocal()
+
+    try:
+        checkpoint = db.get(GameIngestionCheckpoint, log_id)
+
+        if not checkpoint:
+            checkpoint = GameIngestionCheckpoint(log_id=log_id, sequence=0)
+            db.add(checkpoint)
+            db.commit()
+
+        return checkpoint.sequence
+    finally:
+        db.close()
+
+
+async def run_flush_loop() -> None:
+
+    while not state.stopping:
+        try:
+            await asyncio.wait_for(state.flush_requested.wait(), GAME_INGESTION_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+        state.flush_requested.clear()
+
+        try:
+            await flush()
+        except Exception as e:
+            logger.error(f"Failed to flush buffered games; {len(state.queue)} games remain buffered; {e}")
+
+
+def get_log_record(entry: LeaderboardEntry) -> dict:
+
+    return {
+        "sequence": -entry.game_id,
+        "user_id": entry.user_id,
+        "score": entry.score,
+        "created_on": entry.created_on.isoformat()
+    }
+
+
+def write_to_log(records: List[dict]) -> None:
+    """Hand records to the OS without waiting for the disk; sync_log makes them durable"""
+
+    with state.log_lock:
+        log = get_log()
+        log.write("".join(json.dumps(record) + "\n" for record in records))
+        log.flush()
+
+        state.last_logged = max([state.last_logged] + [record.get("sequence", 0) for record in records])
+
+
+def sync_log() -> None:
+    os.fsync(get_log().fileno())
+
+
+def append_to_log(records: List[dict], fsync: bool) -> None:
+
+    write_to_log(records)
+
+    if fsync:
+        sync_log()
+
+
+def append_to_rejected_log(record: dict) -> None:
+
+    with open(f"{GAME_INGESTION_LOG_PATH}.rejected", "a", encoding="utf-8") as log:
+        log.write(json.dumps(record) + "\n")
+
+
+def get_log() -> IO[str]:
+    if not state.log:
+        open_log()
+
+    return state.log
+
+
+def open_log() -> List[LeaderboardEntry]:
+    """Lock the ingestion log for this process and return the games it holds past its last checkpoint"""
+
+    # Only buffered ingestion with a log needs file locks, which are POSIX only
+    import fcntl
+
+    log = open(GAME_INGESTION_LOG_PATH, "a", encoding="utf-8")
+
+    try:
+        fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        log.close()
+        raise RuntimeError(
+            f"Game ingestion log {GAME_INGESTION_LOG_PATH} is locked by another process; "
+            f"buffered ingestion runs a single worker per log"
+        )
+
+    state.log = log
+
+    log_id, entries, checkpoint, last_sequence = read_log()
+
+    # Keep sequences above any checkpoint still in the log
+    state.sequence = itertools.count(last_sequence + 1)
+    state.last_logged = last_sequence
+
+    if log_id:
+        state.log_id = log_id
+    else:
+        state.log_id = uuid.uuid4().hex
+        write_log_header(checkpoint)
+        sync_log()
+
+    return entries
+
+
+def write_log_header(checkpoint: int) -> None:
+    """Name the log, tying it to its row in game_ingestion_checkpoints, and carry the checkpoint forward"""
+
+    state.log.write(json.dumps({"log_id": state.log_id, "checkpoint": checkpoint}) + "\n")
+    state.log.flush()
+
+
+def checkpoint_log(sequence: int) -> None:
+    """Mark every record up to sequence as committed, truncating the log once nothing later was logged"""
+
+    # Records are written from the event loop under log_lock, so fsync outside it
+    with state.log_lock:
+        if state.last_logged <= sequence:
+            get_log().truncate(0)
+            write_log_header(sequence)
+        else:
+            write_to_log([{"checkpoint": sequence}])
+
+    sync_log()
+
+
+def read_log() -> Tuple[Optional[str], List[LeaderboardEntry], int, int]:
+    """Return the log's id, the logged games after its last checkpoint, that checkpoint and the last sequence used"""
+
+    log_id = None
+    entries = []
+    checkpoint = 0
+
+    with open(GAME_INGESTION_LOG_PATH, encoding="utf-8") as log:
+        for line in log:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final write from a crash; the game was never acknowledged
+                logger.warning(f"Skipping unreadable game ingestion log record; {line!r}")
+                continue
+
+            if "log_id" in record:
+                log_id = record["log_id"]
+
+            if "checkpoint" in record:
+                checkpoint = max(checkpoint, record["checkpoint"])
+                continue
+
+            entries.append(LeaderboardEntry(
+                record["user_id"],
+                -record["sequence"],
+                record["score"],
+                datetime.fromisoformat(record["created_on"])
+            ))
+
+    last_sequence = max([checkpoint] + [-entry.game_id for entry in entries])
+
+    return log_id, [entry for entry in entries if -entry.game_id > checkpoint], checkpoint, last_sequence
+
+
+async def recover() -> None:
+    """Buffer the games a previous process logged but never checkpointed
+
+    Games it committed without checkpointing are dropped by the first flush, once the database
+    checkpoint can be read; recovery itself does not need the database.
+    """
+
+    entries = await run_in_threadpool(open_log)
+
+    for entry in entries:
+        buffer(PendingGame(entry))
+
+    if entries:
+        logger.info(f"Recovered buffered games from ingestion log; {len(entries)} games")
+
+
+async def start() -> None:
+    if not is_buffered():
+        return
+
+    state.flush_requested = asyncio.Event()
+
+    if GAME_INGESTION_LOG_PATH:
+        await recover()
+
+    state.flush_task = asyncio.get_running_loop().create_task(run_flush_loop())
+
+    if state.queue:
+        state.flush_requested.set()
+
+
+async def stop() -> None:
+    """Let the flush loop finish its current flush and drain the buffer, then close the log
+
+    The loop is never cancelled mid-flush: a cancelled commit can still land while its games stay
+    buffered, and flushing them again would insert them twice.
+    """
+
+    if state.flush_task:
+        state.stopping = True
+        state.flush_requested.set()
+
+        await state.flush_task
+        state.flush_task = None
+
+    if state.queue:
+        try:
+            await flush()
+        except Exception as e:
+            logger.error(f"Failed to flush buffered games; {len(state.queue)} games remain in the ingestion log; {e}")
+
+    with state.log_lock:
+        if state.log:
+            state.log.close()
+            state.log = None
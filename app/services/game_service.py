@@ -1,121 +1,274 @@
-from app.commonhelper import utils
-from datetime import datetime, timedelta
-from fastapi import Request
-from sqlalchemy import desc
-from sqlalchemy.orm.session import Session
-from typing import List
-
-from app.data.models import Game
-from app.domain.config import ALL_TIME_LEADERBOARD_LIMIT
-from app.dtos.game_dtos import GameCreateRequest, GameResponse
+import csv
+import io
+import orjson
+
+from datetime import datetime, timezone
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import Select
+from typing import Iterator, List, Optional
+
+from app.commonhelper import pagination
+from app.data.enums import LeaderboardPeriod
+from app.data.models import Game, User
+from app.domain.config import ALL_TIME_LEADERBOARD_LIMIT, DAILY_LEADERBOARD_LIMIT, GAME_EXPORT_BATCH_SIZE, \
+    LEADERBOARD_CACHE_CONTROL, WEEKLY_LEADERBOARD_LIMIT
+from app.domain.database import SessionLocal, engine
+from app.dtos.auth_dtos import Principal
+from app.dtos.game_dtos import GameBatchCreateRequest, GameCreateRequest, GameExportFormat, GameResponse
+from app.dtos.pagination_dtos import PagedResponse
 from app.exceptions.app_exceptions import ForbiddenException, NotFoundException
-from app.mappings.game_mappings import game_create_to_game, game_to_game_response
-from app.services import user_service
+from app.mappings.game_mappings import game_create_to_game, game_to_game_response, user_game_to_game_response
+from app.services import game_ingestion_service, leaderboard_service
 
 
-def create_game(db: Session, request: Request, game_data: GameCreateRequest) -> GameResponse:
-    user = user_service.get_current_user(db, request)
+async def create_game(db: AsyncSession, current_user: Principal, game_data: GameCreateRequest) -> GameResponse:
+
+    if game_ingestion_service.is_buffered():
+        return await game_ingestion_service.enqueue(current_user, game_data)
+
     game = game_create_to_game(game_data)
-    game.user_id = user.id
+    game.user_id = current_user.id
 
     db.add(game)
-    db.commit()
-    db.refresh(game)
+    await db.flush()
+
+    ranking_changed = await leaderboard_service.record_game(db, game)
+    await db.commit()
+
+    leaderboard_service.update_memory_leaderboards(game)
+
+    if ranking_changed:
+        leaderboard_service.bump_versions()
+        leaderboard_service.record_snapshot_write()
+
+    game = await get_game_by_id(db, game.id)
 
     response = game_to_game_response(game)
 
     return response
 
 
-def get_games(db: Session, request: Request) -> List[GameResponse]:
+async def create_games(db: AsyncSession, current_user: Principal, batch: GameBatchCreateRequest) -> List[GameResponse]:
+    """Insert a batch of games with one multi-row INSERT, updating leaderboards once for its best game"""
 
-    response = []
+    user = await db.get(User, current_user.id)
+    created_on = datetime.utcnow()
 
-    current_user = user_service.get_current_user(db, request)
+    games = [Game(user_id=user.id, score=game_data.score, created_on=created_on, is_deleted=False) for game_data in batch.games]
 
-    games = db.query(Game).filter(Game.user_id == current_user.id).all()
+    for game, game_id in zip(games, await insert_games(db, games)):
+        game.id = game_id
 
-    if current_user.is_admin:
-        games = db.query(Game).all()
+    best_game = max(games, key=lambda game: (game.score, -game.id))
 
-    for game in games:
-        response.append(game_to_game_response(game))
+    ranking_changed = await leaderboard_service.record_game(db, best_game)
+    await db.commit()
 
-    return response
+    leaderboard_service.update_memory_leaderboards(best_game)
 
+    if ranking_changed:
+        leaderboard_service.bump_versions()
+        leaderboard_service.record_snapshot_write()
 
-def get_game(db: Session, id: int, request: Request) -> GameResponse:
+    return [user_game_to_game_response(game, user) for game in games]
 
-    current_user = user_service.get_current_user(db, request)
-    game = get_game_by_id(db, id)
 
-    if not game:
-        raise NotFoundException(message=f"Game with id: {id} does not exist")
+async def insert_games(db: AsyncSession, games: List[Game]) -> List[int]:
+    """Insert games with a single statement and return their ids in the order given"""
 
-    if not current_user.is_admin and current_user.username != game.user.username:
+    statement = insert(Game).values([
+        {"user_id": game.user_id, "score": game.score, "created_on": game.created_on, "is_deleted": game.is_deleted}
+        for game in games
+    ])
+
+    # Ids come from one sequence in VALUES order, so sorting them restores it whatever order RETURNING uses
+    if engine.dialect.implicit_returning:
+        return sorted((await db.execute(statement.returning(Game.id))).scalars().all())
+
+    # Without RETURNING (SQLite), the statement holds the write lock, so its rowids are consecutive
+    last_id = (await db.execute(statement)).lastrowid
+
+    return list(range(last_id - len(games) + 1, last_id + 1))
+
+
+async def get_games(
+        db: AsyncSession,
+        current_user: Principal,
+        cursor: Optional[str],
+        limit: Optional[int]
+) -> PagedResponse[GameResponse]:
+
+    page_size = pagination.get_page_size(limit)
+
+    query = select(Game).options(joinedload(Game.user))
+
+    if not current_user.is_admin:
+        query = query.where(Game.user_id == current_user.id)
+
+    if cursor:
+        after_id, = pagination.decode_cursor(cursor, 1)
+        query = query.where(Game.id > after_id)
+
+    games = (await db.execute(query.order_by(Game.id).limit(page_size + 1))).scalars().all()
+
+    next_cursor = pagination.encode_cursor(games[page_size - 1].id) if len(games) > page_size else None
+
+    return PagedResponse[GameResponse].construct(
+        items=[game_to_game_response(game) for game in games[:page_size]],
+        next_cursor=next_cursor
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    GameExportFormat.NDJSON: "application/x-ndjson",
+    GameExportFormat.CSV: "text/csv"
+}
+
+
+def export_games(
+        current_user: Principal,
+        export_format: GameExportFormat,
+        user_id: Optional[int],
+        created_from: Optional[datetime],
+        created_to: Optional[datetime]
+) -> StreamingResponse:
+    """Stream matching games in id order, from created_from inclusive to created_to exclusive"""
+
+    if not current_user.is_admin:
         raise ForbiddenException(current_user.username)
 
-    return game_to_game_response(game)
+    query = get_export_query(user_id, created_from, created_to)
 
+    return StreamingResponse(
+        stream_games(query, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename=\"games.{export_format.value}\""}
+    )
 
-def get_daily_leaderboard(db: Session) -> List[GameResponse]:
 
-    today = datetime.today()
+def get_export_query(user_id: Optional[int], created_from: Optional[datetime], created_to: Optional[datetime]) -> Select:
+    query = select(Game.id, Game.user_id, User.username, Game.score, Game.created_on).join(User, Game.user_id == User.id)
 
-    return get_leaderboard(db, today)
+    if user_id is not None:
+        query = query.where(Game.user_id == user_id)
 
+    if created_from:
+        query = query.where(Game.created_on >= to_utc(created_from))
 
-def get_weekly_leaderboard(db: Session) -> List[GameResponse]:
+    if created_to:
+        query = query.where(Game.created_on < to_utc(created_to))
 
-    today = datetime.today()
-    week_start = today + timedelta(days=-today.weekday())
+    return query.order_by(Game.id).execution_options(stream_results=True, yield_per=GAME_EXPORT_BATCH_SIZE)
 
-    return get_leaderboard(db, week_start)
 
+def to_utc(moment: datetime) -> datetime:
+    """created_on is stored as naive UTC"""
 
-def get_all_time_leaderboard(db: Session) -> List[GameResponse]:
+    if moment.tzinfo:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
 
-    response = []
+    return moment
 
-    games = db.query(Game)
 
-    games = games.order_by(desc(Game.score), Game.created_on).all()
+def stream_games(query: Select, export_format: GameExportFormat) -> Iterator[bytes]:
+    """Render one chunk per fetched batch, so memory stays flat however many games match
 
-    games = utils.remove_duplicates(games)
+    StreamingResponse iterates this on the threadpool, so the export reads through the sync engine
+    and, on PostgreSQL, a server-side cursor.
+    """
 
-    games.sort(key=lambda x: x.created_on)
-    games.sort(key=lambda x: x.score, reverse=True)
+    db = SessionLocal()
 
-    games = games[:ALL_TIME_LEADERBOARD_LIMIT]
+    try:
+        if export_format == GameExportFormat.CSV:
+            yield render_csv([query.selected_columns.keys()])
 
-    for game in games:
-        response.append(game_to_game_response(game))
+        for rows in db.execute(query).partitions():
+            if export_format == GameExportFormat.CSV:
+                yield render_csv([(row.id, row.user_id, row.username, row.score, row.created_on.isoformat()) for row in rows])
+            else:
+                yield render_ndjson(rows)
+    finally:
+        db.close()
 
-    return response
 
+def render_csv(rows: List[tuple]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
 
-def get_leaderboard(db: Session, limit: datetime) -> List[GameResponse]:
-    response = []
+    return buffer.getvalue().encode()
 
-    games = db.query(Game)
 
-    games = games.filter(Game.created_on >= limit)
-    games = games.order_by(desc(Game.score), Game.created_on).all()
+def render_ndjson(rows: List[Row]) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
 
-    games = utils.remove_duplicates(games)
 
-    games.sort(key=lambda x: x.created_on)
-    games.sort(key=lambda x: x.score, reverse=True)
+async def get_game(db: AsyncSession, id: int, current_user: Principal) -> GameResponse:
 
-    for game in games:
-        response.append(game_to_game_response(game))
+    game = await get_game_by_id(db, id)
 
-    return response
+    if not game:
+        raise NotFoundException(message=f"Game with id: {id} does not exist")
+
+    if not current_user.is_admin and current_user.username != game.user.username:
+        raise ForbiddenException(current_user.username)
+
+    return game_to_game_response(game)
+
+
+async def get_daily_leaderboard(cursor: Optional[str], limit: Optional[int]) -> PagedResponse[GameResponse]:
+
+    return await leaderboard_service.get_leaderboard_page(LeaderboardPeriod.DAILY, DAILY_LEADERBOARD_LIMIT, cursor, limit)
+
+
+async def get_weekly_leaderboard(cursor: Optional[str], limit: Optional[int]) -> PagedResponse[GameResponse]:
+
+    return await leaderboard_service.get_leaderboard_page(LeaderboardPeriod.WEEKLY, WEEKLY_LEADERBOARD_LIMIT, cursor, limit)
+
+
+async def get_all_time_leaderboard(cursor: Optional[str], limit: Optional[int]) -> PagedResponse[GameResponse]:
+
+    return await leaderboard_service.get_leaderboard_page(LeaderboardPeriod.ALL_TIME, ALL_TIME_LEADERBOARD_LIMIT, cursor, limit)
+
+
+async def check_leaderboard_etag(period: LeaderboardPeriod, if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    """Tag the response with the window's version; return a 304 when the client already holds it"""
+
+    etag = await leaderboard_service.get_etag(period, datetime.utcnow())
+
+    if not etag:
+        response.headers["Cache-Control"] = LEADERBOARD_CACHE_CONTROL
+        return None
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": LEADERBOARD_CACHE_CONTROL
+    }
+
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored"""
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
 
 
-def get_game_by_id(db: Session, id: int) -> Game:
+async def get_game_by_id(db: AsyncSession, id: int) -> Game:
 
-    game = db.query(Game).filter(Game.id == id).first()
+    game = (await db.execute(select(Game).options(joinedload(Game.user)).where(Game.id == id))).scalars().first()
 
     if not game:
         raise NotFoundException(message=f"Game with id: {id} does not exist")
@@ -0,0 +1,796 @@
+import asyncio
+import bisect
+import secrets
+import sqlite3
+
+from datetime import date, datetime, time, timedelta
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+from sqlalchemy import and_, desc, exists, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import Insert
+from sqlalchemy.orm import aliased, joinedload
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.commonhelper import pagination
+from app.commonhelper.single_flight import single_flight
+from app.commonhelper.ranked_leaderboard import EPOCH, LeaderboardEntry, RankedLeaderboard
+from app.data.enums import LeaderboardPeriod
+from app.data.models import Game, User, UserBestScore
+from app.domain.config import ALL_TIME_LEADERBOARD_LIMIT, DAILY_LEADERBOARD_LIMIT, LEADERBOARD_MEMORY_RESYNC_SECONDS, \
+    LEADERBOARD_SNAPSHOT_MAX_STALENESS_SECONDS, LEADERBOARD_SNAPSHOT_SECONDS, LEADERBOARD_SNAPSHOT_WRITES, LEADERBOARD_SOURCE, \
+    LEADERBOARD_VERSION_REFRESH_SECONDS, WEEKLY_LEADERBOARD_LIMIT
+from app.domain.database import SessionLocal, create_session, engine
+from app.dtos.game_dtos import GameResponse
+from app.dtos.pagination_dtos import PagedResponse
+from app.exceptions.app_exceptions import BadRequestException
+from app.mappings.game_mappings import game_to_game_response, leaderboard_entry_to_game_response, user_best_score_to_game_response
+
+
+ALL_TIME_PERIOD_START = date(1970, 1, 1)
+
+WARM_BATCH_SIZE = 10000
+
+BOARD_LIMITS = {
+    LeaderboardPeriod.DAILY: DAILY_LEADERBOARD_LIMIT,
+    LeaderboardPeriod.WEEKLY: WEEKLY_LEADERBOARD_LIMIT,
+    LeaderboardPeriod.ALL_TIME: ALL_TIME_LEADERBOARD_LIMIT
+}
+
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert
+}
+
+
+class LeaderboardPosition(NamedTuple):
+    score: int
+    created_on: datetime
+    game_id: int
+
+
+class MemoryLeaderboard:
+    __slots__ = ("period_start", "board")
+
+    def __init__(self, period_start: date):
+        self.period_start = period_start
+        self.board = RankedLeaderboard()
+
+
+class MemoryLeaderboardState:
+    """Ranked boards for the current daily, weekly and all-time windows"""
+
+    def __init__(self):
+        self.leaderboards: Dict[LeaderboardPeriod, MemoryLeaderboard] = {}
+        self.replay: Optional[List[Game]] = None
+        self.resync_task: Optional[asyncio.Task] = None
+
+
+memory_state = MemoryLeaderboardState()
+
+
+class BoardSignature(NamedTuple):
+    """Row count and newest game id of a window's best scores; both move whenever a best score is added or beaten"""
+
+    period_start: date
+    rows: int
+    latest_game_id: int
+
+
+class LeaderboardVersionState:
+    """Per-window signatures of user_best_scores behind leaderboard ETags
+
+    Signatures come from the database, so every worker, and every restart, derives the same tag
+    for the same board. They are polled to see other workers' writes, and reloaded before the next
+    tag once this process commits a ranking change. Buffered games only live in the process that
+    accepted them, so while any are pending the tag also carries this process's instance id.
+    """
+
+    def __init__(self):
+        self.instance = secrets.token_hex(4)
+        self.signatures: Dict[LeaderboardPeriod, BoardSignature] = {}
+        self.writes = 0
+        self.loaded_writes = -1
+        self.pending_changes = 0
+        self.refresh_task: Optional[asyncio.Task] = None
+
+
+version_state = LeaderboardVersionState()
+
+
+class LeaderboardSnapshot:
+    """A board ranked up to its limit, with sort keys for seeking to a cursor position"""
+
+    __slots__ = ("period_start", "entries", "keys", "taken_at", "signature")
+
+    def __init__(
+            self,
+            period_start: date,
+            entries: List[Tuple["LeaderboardPosition", GameResponse]],
+            taken_at: datetime,
+            signature: BoardSignature
+    ):
+        self.period_start = period_start
+        self.entries = entries
+        self.signature = signature
+        self.keys = [get_position_key(position) for position, _ in entries]
+        self.taken_at = taken_at
+
+
+class LeaderboardSnapshotState:
+
+    def __init__(self):
+        self.snapshots: Dict[LeaderboardPeriod, LeaderboardSnapshot] = {}
+        self.writes = 0
+        self.refresh_requested: Optional[asyncio.Event] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+
+
+snapshot_state = LeaderboardSnapshotState()
+
+
+class PendingGameState:
+    """Buffered games that are accepted but not yet committed, keyed by their provisional ids"""
+
+    def __init__(self):
+        self.entries: Dict[int, LeaderboardEntry] = {}
+
+
+pending_state = PendingGameState()
+
+
+def get_period_start(period: LeaderboardPeriod, moment: datetime) -> date:
+
+    if period == LeaderboardPeriod.DAILY:
+        return moment.date()
+
+    if period == LeaderboardPeriod.WEEKLY:
+        return moment.date() - timedelta(days=moment.weekday())
+
+    return ALL_TIME_PERIOD_START
+
+
+def game_to_best_scores(game: Game) -> List[dict]:
+
+    return [
+        {
+            "user_id": game.user_id,
+            "period": period.name,
+            "period_start": get_period_start(period, game.created_on),
+            "best_score": game.score,
+            "achieved_on": game.created_on,
+            "game_id": game.id
+        }
+        for period in LeaderboardPeriod
+    ]
+
+
+def games_to_best_scores(games: List[Game]) -> List[dict]:
+    """Collapse games to one row per user and window, since a single upsert cannot touch a row twice"""
+
+    best_scores = {}
+
+    for game in sorted(games, key=lambda game: (-game.score, game.created_on, game.id)):
+        for best_score in game_to_best_scores(game):
+            key = best_score["user_id"], best_score["period"], best_score["period_start"]
+            best_scores.setdefault(key, best_score)
+
+    return list(best_scores.values())
+
+
+async def record_game(db: AsyncSession, game: Game) -> bool:
+    """Upsert the game into every period's best scores and return whether any ranking changed
+
+    The caller owns the transaction and should call bump_versions once it has committed.
+    """
+
+    return await upsert_best_scores(db, game_to_best_scores(game))
+
+
+async def upsert_best_scores(db: AsyncSession, best_scores: List[dict]) -> bool:
+    result = await db.execute(get_upsert_statement(best_scores))
+
+    return result.rowcount > 0
+
+
+def get_upsert_statement(best_scores: List[dict]) -> Insert:
+    """INSERT ... ON CONFLICT that only replaces a period's best score when strictly beaten"""
+
+    statement = UPSERT_DIALECTS[engine.dialect.name](UserBestScore).values(best_scores)
+
+    return statement.on_conflict_do_update(
+        index_elements=[UserBestScore.user_id, UserBestScore.period, UserBestScore.period_start],
+        set_={
+            "best_score": statement.excluded.best_score,
+            "achieved_on": statement.excluded.achieved_on,
+            "game_id": statement.excluded.game_id
+        },
+        where=UserBestScore.best_score < statement.excluded.best_score
+    )
+
+
+async def get_etag(period: LeaderboardPeriod, now: datetime) -> Optional[str]:
+    """Tag for the window's current content, or None when a concurrent write leaves it undetermined"""
+
+    period_start = get_period_start(period, now)
+
+    if LEADERBOARD_SNAPSHOT_SECONDS > 0:
+        signature = (await get_snapshot(period)).signature
+    else:
+        signature = version_state.signatures.get(period)
+
+        if version_state.loaded_writes != version_state.writes or not signature or signature.period_start != period_start:
+            await refresh_versions()
+            signature = version_state.signatures.get(period)
+
+        if version_state.loaded_writes != version_state.writes:
+            return None
+
+    if signature.period_start != period_start:
+        return None
+
+    tag = f"{period.name.lower()}-{signature.period_start:%Y%m%d}-{signature.rows}-{signature.latest_game_id}"
+
+    if pending_state.entries:
+        tag += f"-{version_state.instance}-{version_state.pending_changes}"
+
+    return f'"{tag}"'
+
+
+def bump_versions() -> None:
+    """Invalidate every window's ETag until the signatures are reloaded; a game that beats a best score
+    lands in all current windows"""
+
+    version_state.writes += 1
+
+
+async def load_signature(db: AsyncSession, period: LeaderboardPeriod, period_start: date) -> BoardSignature:
+
+    query = select(func.count(), func.max(UserBestScore.game_id)).where(
+        UserBestScore.period == period.name,
+        UserBestScore.period_start == period_start
+    )
+
+    rows, latest_game_id = (await db.execute(query)).one()
+
+    return BoardSignature(period_start, rows, latest_game_id or 0)
+
+
+@single_flight()
+async def refresh_versions() -> None:
+    """Reload every window's signature; writes committed while it runs keep the tags invalidated"""
+
+    writes = version_state.writes
+    now = datetime.utcnow()
+
+    db = create_session()
+
+    try:
+        version_state.signatures = {
+            period: await load_signature(db, period, get_period_start(period, now))
+            for period in LeaderboardPeriod
+        }
+    finally:
+        await db.close()
+
+    version_state.loaded_writes = writes
+
+
+async def run_version_refresh_loop() -> None:
+
+    while True:
+        await asyncio.sleep(LEADERBOARD_VERSION_REFRESH_SECONDS)
+
+        try:
+            await refresh_versions()
+        except Exception as e:
+            logger.error(f"Failed to refresh leaderboard versions; {e}")
+
+
+async def start_version_refresh() -> None:
+    if LEADERBOARD_VERSION_REFRESH_SECONDS <= 0:
+        return
+
+    await refresh_versions()
+
+    version_state.refresh_task = asyncio.get_running_loop().create_task(run_version_refresh_loop())
+
+
+def stop_version_refresh() -> None:
+    if version_state.refresh_task:
+        version_state.refresh_task.cancel()
+        version_state.refresh_task = None
+
+
+@single_flight()
+async def get_leaderboard_page(
+        period: LeaderboardPeriod,
+        board_limit: int,
+        cursor: Optional[str],
+        limit: Optional[int]
+) -> PagedResponse[GameResponse]:
+    """Page through the top board_limit entries of a leaderboard, seeking past the cursor position
+
+    Coalesced callers share this run, so it opens its own session rather than using any one request's.
+    """
+
+    after, served = decode_leaderboard_cursor(cursor)
+    page_size = min(pagination.get_page_size(limit), board_limit - served)
+
+    if page_size <= 0:
+        return PagedResponse[GameResponse].construct(items=[], next_cursor=None)
+
+    db = create_session()
+
+    try:
+        pending_games = await get_pending_games(db, period) if pending_state.entries else []
+
+        # Over-fetch so the page stays full after dropping rows that buffered games outrank
+        fetch_size = page_size + 1 + len(pending_games)
+
+        if LEADERBOARD_SNAPSHOT_SECONDS > 0:
+            ranked_games = get_snapshot_page(await get_snapshot(period), after, fetch_size)
+        else:
+            ranked_games = await get_ranked_games(db, period, after, fetch_size)
+    finally:
+        await db.close()
+
+    if pending_games:
+        ranked_games = merge_pending_games(ranked_games, pending_games, after)
+
+    has_more = len(ranked_games) > page_size and served + page_size < board_limit
+    ranked_games = ranked_games[:page_size]
+
+    next_cursor = encode_leaderboard_cursor(ranked_games[-1][0], served + page_size) if has_more else None
+
+    return PagedResponse[GameResponse].construct(items=[game for _, game in ranked_games], next_cursor=next_cursor)
+
+
+def get_position_key(position: LeaderboardPosition) -> tuple:
+    return -position.score, position.created_on, position.game_id
+
+
+def add_pending_game(entry: LeaderboardEntry) -> None:
+    pending_state.entries[entry.game_id] = entry
+    version_state.pending_changes += 1
+
+
+def remove_pending_games(game_ids: List[int]) -> None:
+    for game_id in game_ids:
+        pending_state.entries.pop(game_id, None)
+
+    version_state.pending_changes += 1
+
+
+async def get_pending_games(db: AsyncSession, period: LeaderboardPeriod) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+    """Each user's best buffered game in the current window, where it beats their committed best score"""
+
+    period_start = get_period_start(period, datetime.utcnow())
+    best_entries: Dict[int, LeaderboardEntry] = {}
+
+    for entry in list(pending_state.entries.values()):
+        if get_period_start(period, entry.created_on) != period_start:
+            continue
+
+        best_entry = best_entries.get(entry.user_id)
+
+        if not best_entry or (-entry.score, entry.created_on, entry.game_id) < (-best_entry.score, best_entry.created_on, best_entry.game_id):
+            best_entries[entry.user_id] = entry
+
+    if not best_entries:
+        return []
+
+    query = select(User, UserBestScore.best_score).outerjoin(
+        UserBestScore,
+        and_(
+            UserBestScore.user_id == User.id,
+            UserBestScore.period == period.name,
+            UserBestScore.period_start == period_start
+        )
+    ).where(User.id.in_(best_entries))
+
+    pending_games = []
+
+    for user, best_score in (await db.execute(query)).all():
+        entry = best_entries[user.id]
+
+        # The upsert only replaces a best score that is strictly beaten
+        if best_score is None or entry.score > best_score:
+            position = LeaderboardPosition(entry.score, entry.created_on, entry.game_id)
+            pending_games.append((position, leaderboard_entry_to_game_response(entry, user)))
+
+    return pending_games
+
+
+def merge_pending_games(
+        ranked_games: List[Tuple[LeaderboardPosition, GameResponse]],
+        pending_games: List[Tuple[LeaderboardPosition, GameResponse]],
+        after: Optional[LeaderboardPosition]
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+    """Replace the committed entries of users with a better buffered game, keeping rank order"""
+
+    usernames = {game.username for _, game in pending_games}
+    after_key = get_position_key(after) if after else None
+
+    merged = [ranked_game for ranked_game in ranked_games if ranked_game[1].username not in usernames]
+    merged += [
+        pending_game for pending_game in pending_games
+        if not after_key or get_position_key(pending_game[0]) > after_key
+    ]
+
+    merged.sort(key=lambda ranked_game: get_position_key(ranked_game[0]))
+
+    return merged
+
+
+async def get_snapshot(period: LeaderboardPeriod) -> LeaderboardSnapshot:
+    """Serve the latest snapshot, refreshing in the background once it is older than the interval
+    and synchronously once it is older than the max staleness or from a previous window"""
+
+    now = datetime.utcnow()
+    snapshot = snapshot_state.snapshots.get(period)
+
+    if not snapshot or snapshot.period_start != get_period_start(period, now):
+        return await take_snapshot(period)
+
+    age = (now - snapshot.taken_at).total_seconds()
+
+    if age > LEADERBOARD_SNAPSHOT_MAX_STALENESS_SECONDS:
+        return await take_snapshot(period)
+
+    if age > LEADERBOARD_SNAPSHOT_SECONDS and snapshot_state.refresh_requested:
+        snapshot_state.refresh_requested.set()
+
+    return snapshot
+
+
+def get_snapshot_page(
+        snapshot: LeaderboardSnapshot,
+        after: Optional[LeaderboardPosition],
+        limit: int
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+
+    start = bisect.bisect_right(snapshot.keys, get_position_key(after)) if after else 0
+
+    return snapshot.entries[start:start + limit]
+
+
+@single_flight()
+async def take_snapshot(period: LeaderboardPeriod) -> LeaderboardSnapshot:
+    now = datetime.utcnow()
+    period_start = get_period_start(period, now)
+
+    db = create_session()
+
+    try:
+        # Read before the entries, so a write in between gives the snapshot an older tag, not a newer one
+        signature = await load_signature(db, period, period_start)
+        entries = await get_ranked_games(db, period, None, BOARD_LIMITS[period])
+    finally:
+        await db.close()
+
+    snapshot = LeaderboardSnapshot(period_start, entries, now, signature)
+    snapshot_state.snapshots[period] = snapshot
+
+    return snapshot
+
+
+async def refresh_snapshots() -> None:
+    for period in LeaderboardPeriod:
+        await take_snapshot(period)
+
+
+def record_snapshot_write() -> None:
+    """Count a ranking change and wake the refresher once enough have accumulated"""
+
+    if LEADERBOARD_SNAPSHOT_WRITES <= 0 or not snapshot_state.refresh_requested:
+        return
+
+    snapshot_state.writes += 1
+
+    if snapshot_state.writes >= LEADERBOARD_SNAPSHOT_WRITES:
+        snapshot_state.refresh_requested.set()
+
+
+async def run_snapshot_loop() -> None:
+
+    while True:
+        try:
+            await asyncio.wait_for(snapshot_state.refresh_requested.wait(), LEADERBOARD_SNAPSHOT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+        snapshot_state.refresh_requested.clear()
+        snapshot_state.writes = 0
+
+        try:
+            await refresh_snapshots()
+        except Exception as e:
+            logger.error(f"Failed to refresh leaderboard snapshots; {e}")
+
+
+async def start_snapshot_refresh() -> None:
+    """Warm every board's snapshot, then keep them fresh from a background task"""
+
+    if LEADERBOARD_SNAPSHOT_SECONDS <= 0:
+        return
+
+    snapshot_state.refresh_requested = asyncio.Event()
+
+    await refresh_snapshots()
+
+    snapshot_state.refresh_task = asyncio.get_running_loop().create_task(run_snapshot_loop())
+
+
+def stop_snapshot_refresh() -> None:
+    if snapshot_state.refresh_task:
+        snapshot_state.refresh_task.cancel()
+        snapshot_state.refresh_task = None
+
+    snapshot_state.refresh_requested = None
+
+
+def encode_leaderboard_cursor(position: LeaderboardPosition, served: int) -> str:
+
+    created_on_us = (position.created_on - EPOCH) // datetime.resolution
+
+    return pagination.encode_cursor(position.score, created_on_us, position.game_id, served)
+
+
+def decode_leaderboard_cursor(cursor: Optional[str]) -> Tuple[Optional[LeaderboardPosition], int]:
+
+    if not cursor:
+        return None, 0
+
+    score, created_on_us, game_id, served = pagination.decode_cursor(cursor, 4)
+
+    if served < 0:
+        raise BadRequestException("Invalid cursor")
+
+    try:
+        created_on = EPOCH + created_on_us * datetime.resolution
+    except OverflowError:
+        raise BadRequestException("Invalid cursor")
+
+    return LeaderboardPosition(score, created_on, game_id), served
+
+
+async def get_ranked_games(
+        db: AsyncSession,
+        period: LeaderboardPeriod,
+        after: Optional[LeaderboardPosition],
+        limit: int
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+
+    period_start = get_period_start(period, datetime.utcnow())
+
+    if LEADERBOARD_SOURCE == "memory":
+        return await get_memory_top_scores(db, period, after, limit)
+
+    if LEADERBOARD_SOURCE == "best_scores":
+        return await get_top_scores(db, period, period_start, after, limit)
+
+    return await get_top_games(db, period_start, after, limit)
+
+
+def ranks_after(score, created_on, id, after: LeaderboardPosition):
+    """Keyset condition for rows ranked below after in score desc, created_on, id order"""
+
+    return or_(
+        score < after.score,
+        and_(score == after.score, created_on > after.created_on),
+        and_(score == after.score, created_on == after.created_on, id > after.game_id)
+    )
+
+
+async def get_top_games(
+        db: AsyncSession,
+        period_start: date,
+        after: Optional[LeaderboardPosition],
+        limit: Optional[int]
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+    """Best game per user since period_start, ranked and limited by the database"""
+
+    query = get_top_games_query(datetime.combine(period_start, time.min), after, limit)
+
+    games = (await db.execute(query)).scalars().all()
+
+    return [(LeaderboardPosition(game.score, game.created_on, game.id), game_to_game_response(game)) for game in games]
+
+
+def get_top_games_query(since: datetime, after: Optional[LeaderboardPosition], limit: Optional[int]):
+
+    if engine.dialect.name == "postgresql":
+        best_games = select(Game).where(Game.created_on >= since)
+        best_games = best_games.order_by(Game.user_id, desc(Game.score), Game.created_on, Game.id).distinct(Game.user_id)
+        best_game = aliased(Game, best_games.subquery())
+
+        query = select(best_game)
+
+    elif engine.dialect.name != "sqlite" or sqlite3.sqlite_version_info >= (3, 25):
+        position = func.row_number().over(partition_by=Game.user_id, order_by=(desc(Game.score), Game.created_on, Game.id))
+        ranked_games = select(Game, position.label("position")).where(Game.created_on >= since).subquery()
+        best_game = aliased(Game, ranked_games)
+
+        query = select(best_game).where(ranked_games.c.position == 1)
+
+    else:
+        # SQLite before 3.25 has no window functions: keep games no other game of the same user beats
+        best_game = Game
+        other_game = aliased(Game)
+
+        beaten = exists().where(
+            other_game.user_id == Game.user_id,
+            other_game.created_on >= since,
+            or_(
+                other_game.score > Game.score,
+                and_(other_game.score == Game.score, other_game.created_on < Game.created_on),
+                and_(other_game.score == Game.score, other_game.created_on == Game.created_on, other_game.id < Game.id)
+            )
+        )
+
+        query = select(Game).where(Game.created_on >= since, ~beaten)
+
+    if after:
+        query = query.where(ranks_after(best_game.score, best_game.created_on, best_game.id, after))
+
+    query = query.options(joinedload(best_game.user))
+    query = query.order_by(desc(best_game.score), best_game.created_on, best_game.id)
+
+    return query.limit(limit)
+
+
+async def get_top_scores(
+        db: AsyncSession,
+        period: LeaderboardPeriod,
+        period_start: date,
+        after: Optional[LeaderboardPosition],
+        limit: Optional[int]
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+
+    query = select(UserBestScore).options(joinedload(UserBestScore.user))
+
+    query = query.where(UserBestScore.period == period.name, UserBestScore.period_start == period_start)
+
+    if after:
+        query = query.where(ranks_after(UserBestScore.best_score, UserBestScore.achieved_on, UserBestScore.game_id, after))
+
+    query = query.order_by(desc(UserBestScore.best_score), UserBestScore.achieved_on, UserBestScore.game_id).limit(limit)
+
+    best_scores = (await db.execute(query)).scalars().all()
+
+    return [
+        (
+            LeaderboardPosition(best_score.best_score, best_score.achieved_on, best_score.game_id),
+            user_best_score_to_game_response(best_score)
+        )
+        for best_score in best_scores
+    ]
+
+
+def get_memory_leaderboard(period: LeaderboardPeriod, now: datetime) -> RankedLeaderboard:
+    """Return the board for the window containing now, starting a fresh one when the window rolls over"""
+
+    period_start = get_period_start(period, now)
+    leaderboard = memory_state.leaderboards.get(period)
+
+    if not leaderboard or leaderboard.period_start < period_start:
+        leaderboard = MemoryLeaderboard(period_start)
+        memory_state.leaderboards[period] = leaderboard
+
+    return leaderboard.board
+
+
+def record_in_memory(user_id: int, game_id: int, score: int, created_on: datetime, now: datetime) -> None:
+
+    for period in LeaderboardPeriod:
+        if get_period_start(period, created_on) == get_period_start(period, now):
+            get_memory_leaderboard(period, now).record(user_id, game_id, score, created_on)
+
+
+def update_memory_leaderboards(game: Game) -> None:
+    """Apply a committed game to the in-memory boards"""
+
+    if LEADERBOARD_SOURCE != "memory":
+        return
+
+    if memory_state.replay is not None:
+        memory_state.replay.append(game)
+
+    record_in_memory(game.user_id, game.id, game.score, game.created_on, datetime.utcnow())
+
+
+def load_memory_leaderboards() -> Dict[LeaderboardPeriod, MemoryLeaderboard]:
+    now = datetime.utcnow()
+    leaderboards = {period: MemoryLeaderboard(get_period_start(period, now)) for period in LeaderboardPeriod}
+
+    db = SessionLocal()
+
+    try:
+        games = db.query(Game.user_id, Game.id, Game.score, Game.created_on).yield_per(WARM_BATCH_SIZE)
+
+        for user_id, game_id, score, created_on in games:
+            for period, leaderboard in leaderboards.items():
+                if get_period_start(period, created_on) == leaderboard.period_start:
+                    leaderboard.board.record(user_id, game_id, score, created_on)
+    finally:
+        db.close()
+
+    return leaderboards
+
+
+async def warm_memory_leaderboards() -> None:
+    """Rebuild the in-memory boards from the games table, replaying games committed meanwhile"""
+
+    memory_state.replay = []
+
+    try:
+        leaderboards = await run_in_threadpool(load_memory_leaderboards)
+        replay = memory_state.replay
+    finally:
+        memory_state.replay = None
+
+    memory_state.leaderboards = leaderboards
+
+    now = datetime.utcnow()
+    for game in replay:
+        record_in_memory(game.user_id, game.id, game.score, game.created_on, now)
+
+    bump_versions()
+
+    all_time_leaderboard = leaderboards[LeaderboardPeriod.ALL_TIME].board
+    logger.info(f"Warmed in-memory leaderboards; {len(all_time_leaderboard)} players")
+
+
+async def run_resync_loop() -> None:
+    """Periodically reload from the database to pick up games committed by other workers"""
+
+    while True:
+        await asyncio.sleep(LEADERBOARD_MEMORY_RESYNC_SECONDS)
+
+        try:
+            await warm_memory_leaderboards()
+        except Exception as e:
+            logger.error(f"Failed to resync in-memory leaderboards; {e}")
+
+
+async def start_memory_leaderboards() -> None:
+    if LEADERBOARD_SOURCE != "memory":
+        return
+
+    await warm_memory_leaderboards()
+
+    if LEADERBOARD_MEMORY_RESYNC_SECONDS > 0:
+        memory_state.resync_task = asyncio.get_running_loop().create_task(run_resync_loop())
+
+
+def stop_memory_leaderboards() -> None:
+    if memory_state.resync_task:
+        memory_state.resync_task.cancel()
+        memory_state.resync_task = None
+
+
+async def get_memory_top_scores(
+        db: AsyncSession,
+        period: LeaderboardPeriod,
+        after: Optional[LeaderboardPosition],
+        limit: Optional[int]
+) -> List[Tuple[LeaderboardPosition, GameResponse]]:
+
+    after_entry = LeaderboardEntry(0, after.game_id, after.score, after.created_on) if after else None
+    entries = get_memory_leaderboard(period, datetime.utcnow()).top(limit, after_entry)
+
+    if not entries:
+        return []
+
+    users = (await db.execute(select(User).where(User.id.in_({entry.user_id for entry in entries})))).scalars().all()
+    users_by_id = {user.id: user for user in users}
+
+    return [
+        (
+            LeaderboardPosition(entry.score, entry.created_on, entry.game_id),
+            leaderboard_entry_to_game_response(entry, users_by_id[entry.user_id])
+        )
+        for entry in entries
+    ]
@@ -0,0 +1,83 @@
+from sqlalchemy.engine import Engine
+from typing import List
+
+from app.auth import token_cache
+from app.commonhelper import prometheus_metrics, single_flight
+from app.domain import database
+from app.dtos.auth_dtos import Principal
+from app.dtos.metrics_dtos import DatabasePoolMetricsResponse, PasswordHashingMetricsResponse, SingleFlightMetricsResponse, \
+    TokenCacheMetricsResponse
+from app.exceptions.app_exceptions import ForbiddenException
+from app.services import password_hashing_service
+
+
+def get_password_hashing_metrics(current_user: Principal) -> PasswordHashingMetricsResponse:
+
+    if not current_user.is_admin:
+        raise ForbiddenException(current_user.username)
+
+    return password_hashing_service.get_metrics()
+
+
+def get_token_cache_metrics(current_user: Principal) -> TokenCacheMetricsResponse:
+
+    if not current_user.is_admin:
+        raise ForbiddenException(current_user.username)
+
+    return token_cache.get_metrics()
+
+
+def get_prometheus_metrics(current_user: Principal) -> bytes:
+
+    if not current_user.is_admin:
+        raise ForbiddenException(current_user.username)
+
+    return prometheus_metrics.render_metrics()
+
+
+def get_database_pool_metrics(current_user: Principal) -> List[DatabasePoolMetricsResponse]:
+
+    if not current_user.is_admin:
+        raise ForbiddenException(current_user.username)
+
+    response = [get_pool_metrics("sync", database.engine)]
+
+    if database.async_engine:
+        response.append(get_pool_metrics("async", database.async_engine.sync_engine))
+
+    return response
+
+
+def get_pool_metrics(name: str, engine: Engine) -> DatabasePoolMetricsResponse:
+    pool = engine.pool
+    stats = pool.stats
+
+    return DatabasePoolMetricsResponse(
+        engine=name,
+        pool_size=pool.size(),
+        max_overflow=pool._max_overflow,
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        average_wait_ms=stats.total_wait / stats.checkouts * 1000 if stats.checkouts else 0.0,
+        max_wait_ms=stats.max_wait * 1000
+    )
+
+
+def get_single_flight_metrics(current_user: Principal) -> List[SingleFlightMetricsResponse]:
+
+    if not current_user.is_admin:
+        raise ForbiddenException(current_user.username)
+
+    return [
+        SingleFlightMetricsResponse(
+            name=group.name,
+            calls=group.calls,
+            executions=group.executions,
+            coalesced=group.coalesced,
+            in_flight=len(group.in_flight)
+        )
+        for group in single_flight.groups.values()
+    ]
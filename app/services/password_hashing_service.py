@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from app.commonhelper import utils
+from app.domain.config import PASSWORD_HASHING_QUEUE_SIZE, PASSWORD_HASHING_WORKERS
+from app.dtos.auth_dtos import PasswordDto
+from app.dtos.metrics_dtos import PasswordHashingMetricsResponse
+from app.exceptions.app_exceptions import ServiceUnavailableException
+
+
+class PasswordHashingState:
+    """Process pool and counters backing the awaitable hashing API"""
+
+    def __init__(self):
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+
+state = PasswordHashingState()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    if not state.executor:
+        state.executor = ProcessPoolExecutor(max_workers=PASSWORD_HASHING_WORKERS)
+
+    return state.executor
+
+
+def shutdown() -> None:
+    if state.executor:
+        state.executor.shutdown(wait=True)
+        state.executor = None
+
+
+async def run_in_pool(func: Callable, *args):
+    """Run a hashing function on the process pool, rejecting work once the pool backlog is full"""
+
+    if state.in_flight >= PASSWORD_HASHING_WORKERS + PASSWORD_HASHING_QUEUE_SIZE:
+        state.rejected += 1
+        raise ServiceUnavailableException("Password hashing capacity exhausted, please try again shortly")
+
+    state.in_flight += 1
+    start_time = time.perf_counter()
+
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+    except asyncio.CancelledError:
+        state.cancelled += 1
+        raise
+    except Exception:
+        state.failed += 1
+        raise
+    finally:
+        state.in_flight -= 1
+
+    # Only successful hashes feed throughput and latency
+    latency = time.perf_counter() - start_time
+
+    state.completed += 1
+    state.total_latency += latency
+    state.max_latency = max(state.max_latency, latency)
+
+    return result
+
+
+async def hash_password(password: str) -> PasswordDto:
+    return await run_in_pool(utils.generate_hash_and_salt, password)
+
+
+async def verify_password(password: str, stored_password: PasswordDto) -> bool:
+    return await run_in_pool(utils.verify_password_hash, password, stored_password)
+
+
+def get_metrics() -> PasswordHashingMetricsResponse:
+
+    average_latency = state.total_latency / state.completed if state.completed else 0.0
+
+    return PasswordHashingMetricsResponse(
+        workers=PASSWORD_HASHING_WORKERS,
+        queue_size=PASSWORD_HASHING_QUEUE_SIZE,
+        in_flight=state.in_flight,
+        queue_depth=max(state.in_flight - PASSWORD_HASHING_WORKERS, 0),
+        completed=state.completed,
+        failed=state.failed,
+        cancelled=state.cancelled,
+        rejected=state.rejected,
+        average_latency_ms=average_latency * 1000,
+        max_latency_ms=state.max_latency * 1000
+    )
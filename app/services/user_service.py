@@ -1,36 +1,51 @@
-from fastapi import Request
 from pydantic import EmailStr
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.session import Session
-from typing import List
+from typing import Optional
 
+from app.auth import token_cache, token_revocation
 from app.data.models import User
-from app.dtos.auth_dtos import ExternalLoginRequest
+from app.domain.config import STATELESS_JWT_VERIFICATION
+from app.domain.database import create_session
+from app.dtos.auth_dtos import ExternalLoginRequest, PasswordDto, Principal
+from app.dtos.pagination_dtos import PagedResponse
 from app.dtos.user_dtos import UserCreateRequest, UserResponse, UserAdminStatusRequest, UserAvatarRequest, UserUpdateRequest
-from app.commonhelper import utils
+from app.commonhelper import pagination, utils
+from app.commonhelper.single_flight import single_flight
 from app.exceptions.app_exceptions import BadRequestException, ForbiddenException, NotFoundException
 from app.mappings.auth_mappings import external_login_to_user
-from app.mappings.user_mappings import user_create_to_user, user_to_user_response
-from app.services import auth_service
+from app.mappings.user_mappings import principal_to_user_response, user_create_to_user, user_to_user_response
+from app.services import password_hashing_service
 
 
-def create_user(db: Session, user_data: UserCreateRequest) -> UserResponse:
+async def create_user(db: AsyncSession, user_data: UserCreateRequest) -> UserResponse:
 
-    user = user_create_to_user(user_data)
+    password = await password_hashing_service.hash_password(user_data.password)
+
+    user = user_create_to_user(user_data, password)
+
+    return await save_user(db, user)
+
+
+async def save_user(db: AsyncSession, user: User) -> UserResponse:
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return user_to_user_response(user)
 
 
-def create_social_user(db: Session, external_login_data: ExternalLoginRequest):
+async def create_social_user(db: AsyncSession, external_login_data: ExternalLoginRequest) -> User:
 
     user = external_login_to_user(external_login_data)
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    return user
 
 
 def seed_user(db: Session, email: EmailStr, first_name: str, last_name: str, password: str) -> UserResponse:
@@ -42,7 +57,15 @@ def seed_user(db: Session, email: EmailStr, first_name: str, last_name: str, pas
         password=password
     )
 
-    admin_user = create_user(db, payload)
+    password = utils.generate_hash_and_salt(payload.password)
+    user = user_create_to_user(payload, password)
+
+    # Seeding runs at startup, before the event loop, on a synchronous session
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    admin_user = user_to_user_response(user)
     return admin_user
 
 
@@ -58,49 +81,51 @@ def set_super_admin(db: Session, id: int):
     return user_to_user_response(user)
 
 
-def change_admin_status(db: Session, id: int, user_admin_status: UserAdminStatusRequest, request: Request) -> UserResponse:
-
-    current_user = get_current_user(db, request)
+async def change_admin_status(db: AsyncSession, id: int, user_admin_status: UserAdminStatusRequest, current_user: Principal) -> UserResponse:
 
     if not current_user.is_staff:
         raise ForbiddenException(current_user.email)
 
-    user = get_user_by_id(db, id)
+    user = await get_user_by_id(db, id)
 
     if user.is_staff:
         raise BadRequestException("Cannot modify admin status of super admin user")
 
     user.is_admin = user_admin_status.is_admin
+    bump_token_version(user)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    token_revocation.revoke(user.id, user.token_version)
+    token_cache.evict_user(user.id)
 
     response = user_to_user_response(user)
 
     return response
 
 
-def set_user_avatar(db: Session, user_avatar: UserAvatarRequest, request: Request) -> UserResponse:
-
-    current_user = get_current_user(db, request)
+async def set_user_avatar(db: AsyncSession, user_avatar: UserAvatarRequest, current_user: Principal) -> UserResponse:
 
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = await get_user_by_id(db, current_user.id)
 
     user.avatar = user_avatar.avatar
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    token_cache.evict_user(user.id)
 
     return user_to_user_response(user)
 
 
-def update_user(db: Session, id: int, request: Request, user_data: UserUpdateRequest) -> UserResponse:
+async def update_user(db: AsyncSession, id: int, current_user: Principal, user_data: UserUpdateRequest) -> UserResponse:
 
-    username = get_username_from_token(db, request)
+    username = current_user.username
 
-    password_hash, password_salt = utils.generate_hash_and_salt(user_data.password)
+    password = await password_hashing_service.hash_password(user_data.password)
 
-    user = get_user_by_id(db, id)
+    user = await get_user_by_id(db, id)
 
     if user.is_staff:
         raise BadRequestException("Cannot modify super admin user")
@@ -110,43 +135,80 @@ def update_user(db: Session, id: int, request: Request, user_data: UserUpdateReq
 
     user_data_username = user_data.email if user_data.email else user_data.phone_number
 
-    if get_user_by_username(db, user_data_username) and user.username != user_data_username:
+    if await get_user_by_username(db, user_data_username) and user.username != user_data_username:
         raise BadRequestException(f"Cannot update username. User with username: '{user_data_username}' already exists")
 
     user.username = user_data_username
     user.email = user_data.email
     user.fname = user_data.first_name
     user.lname = user_data.last_name
-    user.password_hash = password_hash
-    user.password_salt = password_salt
+    set_user_password(user, password)
+    bump_token_version(user)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+
+    token_revocation.revoke(user.id, user.token_version)
+    token_cache.evict_user(user.id)
 
     return user_to_user_response(user)
 
 
-def get_users(db: Session, request: Request) -> List[UserResponse]:
+def set_user_password(user: User, password: PasswordDto) -> None:
+
+    user.password_hash = password.password_hash
+    user.password_salt = password.password_salt
+    user.password_hash_format = password.password_hash_format
+
 
-    response = []
+def bump_token_version(user: User) -> None:
+    """Invalidate every token issued to the user so far"""
 
-    current_user = get_current_user(db, request)
+    user.token_version = (user.token_version or 0) + 1
+
+
+async def get_users(
+        current_user: Principal,
+        cursor: Optional[str],
+        limit: Optional[int]
+) -> PagedResponse[UserResponse]:
 
     if not current_user.is_admin:
         raise ForbiddenException(current_user.username)
 
-    users = db.query(User).all()
+    return await get_users_page(cursor, limit)
 
-    for user in users:
-        response.append(user_to_user_response(user))
 
-    return response
+@single_flight()
+async def get_users_page(cursor: Optional[str], limit: Optional[int]) -> PagedResponse[UserResponse]:
+
+    page_size = pagination.get_page_size(limit)
+
+    query = select(User)
 
+    if cursor:
+        after_id, = pagination.decode_cursor(cursor, 1)
+        query = query.where(User.id > after_id)
 
-def get_user(db: Session, id: int, request: Request) -> UserResponse:
+    # Coalesced callers share this run, so it cannot use any one request's session
+    db = create_session()
 
-    current_user = get_current_user(db, request)
-    user = get_user_by_id(db, id)
+    try:
+        users = (await db.execute(query.order_by(User.id).limit(page_size + 1))).scalars().all()
+    finally:
+        await db.close()
+
+    next_cursor = pagination.encode_cursor(users[page_size - 1].id) if len(users) > page_size else None
+
+    return PagedResponse[UserResponse].construct(
+        items=[user_to_user_response(user) for user in users[:page_size]],
+        next_cursor=next_cursor
+    )
+
+
+async def get_user(db: AsyncSession, id: int, current_user: Principal) -> UserResponse:
+
+    user = await get_user_by_id(db, id)
 
     if not current_user.is_admin and current_user.username != user.username:
         raise ForbiddenException(current_user.email)
@@ -154,17 +216,18 @@ def get_user(db: Session, id: int, request: Request) -> UserResponse:
     return user_to_user_response(user)
 
 
-def get_current_user(db: Session, request: Request) -> UserResponse:
+async def get_current_user(db: AsyncSession, current_user: Principal) -> UserResponse:
 
-    username = get_username_from_token(db, request)
-    user = get_user_by_username(db, username)
+    # Stateless principals are built from token claims and carry no profile fields
+    if STATELESS_JWT_VERIFICATION:
+        return user_to_user_response(await get_user_by_id(db, current_user.id))
 
-    return user_to_user_response(user)
+    return principal_to_user_response(current_user)
 
 
-def get_user_by_username(db: Session, username: str) -> User:
+async def get_user_by_username(db: AsyncSession, username: str) -> User:
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
 
     if not user:
         raise NotFoundException(message=f"User with username: {username} does not exist")
@@ -172,18 +235,11 @@ def get_user_by_username(db: Session, username: str) -> User:
     return user
 
 
-def get_user_by_id(db: Session, id: int) -> User:
+async def get_user_by_id(db: AsyncSession, id: int) -> User:
 
-    user = db.query(User).filter(User.id == id).first()
+    user = (await db.execute(select(User).where(User.id == id))).scalars().first()
 
     if not user:
         raise NotFoundException(message=f"User with id: {id} does not exist")
 
     return user
-
-
-def get_username_from_token(db: Session, request: Request) -> EmailStr:
-
-    token = request.headers.get("Authorization").split(" ")[1]
-    payload = auth_service.decode_jwt(db, token)
-    return payload.get("sub")
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm.session import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.commonhelper import utils
 from app.data.models import UserToken
@@ -9,12 +10,12 @@ from app.exceptions.app_exceptions import BadRequestException
 from app.services import user_service
 
 
-def generate_token(db: Session, length: int, keyspace: str, expiry: int, token_type: UserTokenType, user_id: int) -> UserToken:
+async def generate_token(db: AsyncSession, length: int, keyspace: str, expiry: int, token_type: UserTokenType, user_id: int) -> UserToken:
 
-    user = user_service.get_user_by_id(db, user_id)
+    user = await user_service.get_user_by_id(db, user_id)
 
     validate_expiry(expiry)
-    delete_old_token_if_exists(db, user.id, token_type)
+    await delete_old_token_if_exists(db, user.id, token_type)
 
     user_token = UserToken(
         token=utils.generate_code(length, keyspace),
@@ -25,34 +26,36 @@ def generate_token(db: Session, length: int, keyspace: str, expiry: int, token_t
     user_token.user_id = user.id
 
     db.add(user_token)
-    db.commit()
-    db.refresh(user_token)
+    await db.commit()
+    await db.refresh(user_token)
 
     return user_token
 
 
-def use_token(db: Session, user_id: int, token: str, token_type: UserTokenType):
+async def use_token(db: AsyncSession, user_id: int, token: str, token_type: UserTokenType):
 
-    if not validate_token(db, user_id, token, token_type):
+    if not await validate_token(db, user_id, token, token_type):
         raise BadRequestException("Invalid user token")
     
-    db.query(UserToken).filter(UserToken.user_id == user_id, UserToken.token_type == token_type.name).delete()
-    db.commit()
+    await db.execute(delete(UserToken).where(UserToken.user_id == user_id, UserToken.token_type == token_type.name))
+    await db.commit()
 
 
-def verify_user_token(db: Session, request: VerifyUserTokenRequest) -> bool:
+async def verify_user_token(db: AsyncSession, request: VerifyUserTokenRequest) -> bool:
 
-    user = user_service.get_user_by_username(db, request.username)
+    user = await user_service.get_user_by_username(db, request.username)
 
     if request.token_type not in UserTokenType.__members__:
         raise BadRequestException("Invalid token type")
 
-    return validate_token(db, user.id, request.token, UserTokenType[request.token_type])
+    return await validate_token(db, user.id, request.token, UserTokenType[request.token_type])
 
 
-def validate_token(db: Session, user_id: int, token: str, token_type: UserTokenType) -> bool:
+async def validate_token(db: AsyncSession, user_id: int, token: str, token_type: UserTokenType) -> bool:
 
-    user_token = db.query(UserToken).filter(UserToken.user_id == user_id, UserToken.token_type == token_type.name).first()
+    user_token = (await db.execute(
+        select(UserToken).where(UserToken.user_id == user_id, UserToken.token_type == token_type.name)
+    )).scalars().first()
 
     if not user_token:
         raise BadRequestException(f"User token for token type: {token_type.name} does not exist for given user")
@@ -70,6 +73,6 @@ def validate_expiry(expiry: int):
         raise BadRequestException("Expiry in minutes must be greater than 0")
 
 
-def delete_old_token_if_exists(db: Session, user_id: int, token_type: UserTokenType):
-    db.query(UserToken).filter(UserToken.user_id == user_id, UserToken.token_type == token_type.name).delete()
-    db.commit()
+async def delete_old_token_if_exists(db: AsyncSession, user_id: int, token_type: UserTokenType):
+    await db.execute(delete(UserToken).where(UserToken.user_id == user_id, UserToken.token_type == token_type.name))
+    await db.commit()
@@ -0,0 +1,77 @@
+"""Caller-side cost of logging per request, with SQL echo on and with the production profile
+
+Run from the repository root with the application's environment loaded:
+
+    python -m benchmarks.logging_benchmark --queries 10 --requests 2000
+
+Each simulated request logs its statements through sqlalchemy.engine the way SQLAlchemy does,
+checking isEnabledFor first, and writes one access log record. "echo" keeps sqlalchemy.engine at
+INFO, as logging.conf alone does; "production" applies the default LOGGER_LEVELS_CONFIG. Both go
+through InterceptHandler into an enqueued loguru sink writing to /dev/null.
+"""
+import argparse
+import logging
+import os
+import time
+
+from loguru import logger
+
+from app.config.loguru_logging import apply_logger_levels
+from app.config.loguru_logging_intercept import setup_loguru_logging_intercept
+from app.domain.config import LOGGER_LEVELS_CONFIG
+from app.middleware.access_log import log_request
+
+
+STATEMENT = "SELECT games.id, games.score, games.created_on FROM games WHERE games.user_id = %(user_id)s LIMIT %(limit)s"
+
+SCOPE = {"method": "GET", "path": "/api/v1/games/daily-leaderboard", "client": ("127.0.0.1", 50000)}
+
+
+def simulate_request(sql_logger: logging.Logger, queries: int) -> None:
+
+    for i in range(queries):
+        if sql_logger.isEnabledFor(logging.INFO):
+            sql_logger.info(STATEMENT)
+            sql_logger.info("[cached since %.4gs ago] %r", 0.5, {"user_id": i, "limit": 50})
+
+    log_request(SCOPE, 200, 1.0)
+
+
+def measure(levels: dict, queries: int, requests: int) -> float:
+    apply_logger_levels(levels)
+    setup_loguru_logging_intercept(modules=("sqlalchemy.engine",))
+
+    sql_logger = logging.getLogger("sqlalchemy.engine.Engine")
+
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        simulate_request(sql_logger, queries)
+
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(open(os.devnull, "w"), level="DEBUG", enqueue=True)
+
+    profiles = (
+        ("echo", {**LOGGER_LEVELS_CONFIG, "sqlalchemy.engine": "INFO"}),
+        ("production", LOGGER_LEVELS_CONFIG)
+    )
+
+    for name, levels in profiles:
+        per_request = measure(levels, args.queries, args.requests)
+        print(f"{name:>10}: {per_request * 10 ** 6:8.2f} us/request")
+
+        # Drain the sink's queue so the next profile does not pay for this one's backlog
+        logger.complete()
+
+
+if __name__ == "__main__":
+    main()
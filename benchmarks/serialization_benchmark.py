@@ -0,0 +1,89 @@
+"""Per-row cost of rendering a leaderboard page, before and after the fast JSON path
+
+Run from the repository root with the application's environment loaded:
+
+    python -m benchmarks.serialization_benchmark --rows 1000 --repeat 50
+
+"validated" builds each GameResponse with validation and lets FastAPI check the page against
+response_model and encode it with jsonable_encoder; "fast" uses the construct() mappers and
+FastJSONResponse, which is what routes do with FAST_JSON_RESPONSES=1.
+"""
+import argparse
+import asyncio
+import time
+
+from datetime import datetime
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from types import SimpleNamespace
+
+from app.commonhelper.fast_json import FastJSONResponse
+from app.dtos.game_dtos import GameResponse
+from app.dtos.pagination_dtos import PagedResponse
+from app.mappings.game_mappings import game_to_game_response
+
+
+def make_games(rows: int) -> list:
+    games = []
+
+    for i in range(rows):
+        user = SimpleNamespace(username=f"player{i}@example.com", fname="Ada", lname="Lovelace", avatar=i % 12)
+        games.append(SimpleNamespace(id=i, score=10 ** 6 - i, created_on=datetime.utcnow(), user=user))
+
+    return games
+
+
+async def render_validated(games: list, field) -> bytes:
+    items = [
+        GameResponse(
+            id=game.id,
+            score=game.score,
+            username=game.user.username,
+            first_name=game.user.fname,
+            last_name=game.user.lname,
+            avatar=game.user.avatar
+        )
+        for game in games
+    ]
+    page = PagedResponse[GameResponse](items=items, next_cursor=None)
+
+    content = await serialize_response(field=field, response_content=page, is_coroutine=True)
+
+    return JSONResponse(content).body
+
+
+async def render_fast(games: list, field) -> bytes:
+    page = PagedResponse[GameResponse].construct(items=[game_to_game_response(game) for game in games], next_cursor=None)
+
+    return FastJSONResponse(page).body
+
+
+async def measure(render, games: list, repeat: int) -> float:
+    field = create_response_field(name="Response_benchmark", type_=PagedResponse[GameResponse])
+
+    assert await render_validated(games[:3], field) == await render_fast(games[:3], field)
+
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        await render(games, field)
+
+    return (time.perf_counter() - started) / (repeat * len(games))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    games = make_games(args.rows)
+
+    for name, render in (("validated", render_validated), ("fast", render_fast)):
+        per_row = asyncio.run(measure(render, games, args.repeat))
+        print(f"{name:>9}: {per_row * 10 ** 6:7.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,15 +10,16 @@ fake = Faker()
 
 
 def create_user(db: Session, password) -> User:
-    password_hash, password_salt = utils.generate_hash_and_salt(password)
+    user_password = utils.generate_hash_and_salt(password)
 
     user = User(
         username=fake.email(),
         email=fake.email(),
         fname=fake.first_name(),
         lname=fake.last_name(),
-        password_hash=password_hash,
-        password_salt=password_salt
+        password_hash=user_password.password_hash,
+        password_salt=user_password.password_salt,
+        password_hash_format=user_password.password_hash_format
     )
 
     db.add(user)
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from app.domain.constants import DOCS_URL, GAMES_URL
+from app.main import app
+from app.middleware import access_log
+
+client = TestClient(app)
+
+
+def test_access_log_samples_successes_but_keeps_errors(monkeypatch):
+    records = []
+    handler_id = logger.add(records.append, filter=access_log.__name__, format="{message}")
+
+    monkeypatch.setattr(access_log, "ACCESS_LOG_SUCCESS_SAMPLE_RATE", 0.0)
+
+    try:
+        client.get(DOCS_URL)
+        client.get(f"{GAMES_URL}/daily-leaderboard")
+    finally:
+        logger.remove(handler_id)
+
+    assert len(records) == 1
+    assert records[0].record["extra"]["method"] == "GET"
+    assert records[0].record["extra"]["path"] == f"{GAMES_URL}/daily-leaderboard"
+    assert records[0].record["extra"]["status_code"] == 401
+    assert records[0].record["extra"]["duration_ms"] > 0
@@ -1,11 +1,19 @@
+import asyncio
+import os
+import pytest
+
 from fastapi.testclient import TestClient
 from faker import Faker
 
+from app.auth import token_cache, token_revocation
+from app.commonhelper import utils
 from app.data.models import User
-from app.domain.constants import AUTH_URL
+from app.domain import database
+from app.domain.constants import AUTH_URL, GAMES_URL, USERS_URL
 from app.main import app
+from app.services import auth_service, password_hashing_service, user_service
 from tests.domain import create_user
-from tests.utils import get_db
+from tests.utils import get_auth_headers, get_db
 
 client = TestClient(app)
 fake = Faker()
@@ -29,6 +37,85 @@ def test_user_can_obtain_auth_token():
     assert "token_type" in response.json()
 
 
+def test_legacy_password_hash_is_upgraded_on_login():
+    db = get_db()
+    password = fake.password()
+    password_salt = os.urandom(32)
+
+    user = create_user(db, fake.password())
+    user = db.query(User).filter(User.id == user.id).first()
+    user.password_hash = utils.derive_password_key(password, password_salt, utils.LEGACY_PASSWORD_HASH_PARAMS)
+    user.password_salt = password_salt
+    user.password_hash_format = None
+    db.commit()
+
+    payload = {
+        "username": user.username,
+        "password": password
+    }
+
+    response = client.post(f"{AUTH_URL}/login", json=payload)
+
+    db.refresh(user)
+    db.close()
+
+    assert response.status_code == 200
+    assert user.password_hash_format == utils.PASSWORD_HASH_POLICY.to_format()
+    assert len(user.password_hash) == utils.PASSWORD_HASH_POLICY.dklen
+
+    response = client.post(f"{AUTH_URL}/login", json=payload)
+
+    assert response.status_code == 200
+
+
+def test_user_cannot_obtain_auth_token_with_wrong_password():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    payload = {
+        "username": user.username,
+        "password": fake.password()
+    }
+
+    response = client.post(f"{AUTH_URL}/login", json=payload)
+
+    assert response.status_code == 401
+
+
+def test_login_is_rejected_when_password_hashing_pool_is_saturated(monkeypatch):
+    db = get_db()
+    password = fake.password()
+
+    user = create_user(db, password)
+
+    payload = {
+        "username": user.username,
+        "password": password
+    }
+
+    monkeypatch.setattr(password_hashing_service.state, "in_flight", 10 ** 6)
+
+    response = client.post(f"{AUTH_URL}/login", json=payload)
+
+    assert response.status_code == 503
+    assert response.json().get("code") == "ServiceUnavailable"
+
+
+def test_failed_hash_is_not_counted_as_completed(monkeypatch):
+    monkeypatch.setattr(password_hashing_service, "state", password_hashing_service.PasswordHashingState())
+
+    with pytest.raises(ValueError):
+        asyncio.run(password_hashing_service.run_in_pool(int, "not-a-number"))
+
+    metrics = password_hashing_service.get_metrics()
+    password_hashing_service.shutdown()
+
+    assert metrics.completed == 0
+    assert metrics.failed == 1
+    assert metrics.average_latency_ms == 0.0
+
+
 def test_social_login_user_can_obtain_auth_token():
     db = get_db()
 
@@ -65,6 +152,106 @@ def test_social_login_user_can_obtain_auth_token():
     assert user_exists
 
 
+def test_token_is_rejected_after_token_version_changes():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.status_code == 200
+
+    db.query(User).filter(User.id == user.id).update({User.token_version: User.token_version + 1})
+    db.commit()
+    db.close()
+
+    token_cache.evict_user(user.id)
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.status_code == 401
+
+
+def test_rejected_token_releases_its_database_connection():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    db.query(User).filter(User.id == user.id).update({User.token_version: User.token_version + 1})
+    db.commit()
+    db.close()
+
+    pool = (database.async_engine.sync_engine if database.async_engine else database.engine).pool
+    checked_out = pool.checkedout()
+
+    response = client.get(f"{USERS_URL}/me", headers=get_auth_headers(user))
+
+    assert response.status_code == 401
+    assert pool.checkedout() == checked_out
+
+
+def test_stateless_verification_skips_user_lookup_and_honours_revocation(monkeypatch):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    def get_user_by_username(db, username):
+        raise AssertionError("Stateless verification must not load the user")
+
+    monkeypatch.setattr(auth_service, "STATELESS_JWT_VERIFICATION", True)
+    monkeypatch.setattr(user_service, "get_user_by_username", get_user_by_username)
+
+    response = client.get(f"{GAMES_URL}", headers=headers)
+
+    assert response.status_code == 200
+
+    monkeypatch.setitem(token_revocation.table.versions, user.id, 1)
+
+    response = client.get(f"{GAMES_URL}", headers=headers)
+
+    assert response.status_code == 401
+
+
+def test_verified_token_is_served_from_cache():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    client.get(f"{USERS_URL}/me", headers=headers)
+    hits = token_cache.cache.hits
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.status_code == 200
+    assert token_cache.cache.hits == hits + 1
+
+
+def test_cached_token_is_rejected_once_another_workers_revocation_is_refreshed():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    client.get(f"{USERS_URL}/me", headers=headers)
+
+    db.query(User).filter(User.id == user.id).update({User.token_version: User.token_version + 1})
+    db.commit()
+    db.close()
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.status_code == 200
+
+    token_revocation.refresh()
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.status_code == 401
+
+
 def test_user_can_request_password_reset():
     pass
 
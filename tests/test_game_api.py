@@ -0,0 +1,592 @@
+import asyncio
+import json
+import pytest
+import uuid
+
+from fastapi.testclient import TestClient
+from faker import Faker
+
+from app.commonhelper import pagination
+from app.data.enums import LeaderboardPeriod
+from app.data.leaderboard_backfill import backfill_user_best_scores
+from app.data.models import Game, GameIngestionCheckpoint, User, UserBestScore
+from app.domain.constants import GAMES_URL
+from app.dtos.game_dtos import GameCreateRequest
+from app.main import app
+from app.mappings.auth_mappings import user_to_principal
+from app.services import game_ingestion_service, game_service, leaderboard_service
+from tests.domain import create_game, create_user
+from tests.utils import assert_queries_do_not_scale, count_queries, get_auth_headers, get_db
+
+client = TestClient(app)
+fake = Faker()
+
+
+def test_user_can_create_game():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    payload = {
+        "score": 42
+    }
+
+    response = client.post(f"{GAMES_URL}", json=payload, headers=get_auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json().get("score") == 42
+    assert response.json().get("username") == user.username
+
+
+def test_user_can_create_games_in_a_batch():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    response = client.post(f"{GAMES_URL}/batch", json={"games": [{"score": 5}, {"score": 7}, {"score": 6}]}, headers=headers)
+    games = client.get(f"{GAMES_URL}", headers=headers).json()["items"]
+    best_score = db.query(UserBestScore).filter(
+        UserBestScore.user_id == user.id,
+        UserBestScore.period == LeaderboardPeriod.DAILY.name
+    ).first()
+    db.close()
+
+    assert response.status_code == 200
+    assert [game["score"] for game in response.json()] == [5, 7, 6]
+    assert [game["id"] for game in games] == [game["id"] for game in response.json()]
+    assert response.json()[0]["username"] == user.username
+    assert best_score.best_score == 7
+
+
+def test_batch_is_inserted_with_one_statement():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+    client.get(f"{GAMES_URL}", headers=headers)
+
+    with count_queries() as statements:
+        response = client.post(f"{GAMES_URL}/batch", json={"games": [{"score": 1}, {"score": 3}, {"score": 2}]}, headers=headers)
+
+    ids = [game["id"] for game in response.json()]
+    scores = dict(db.query(Game.id, Game.score).filter(Game.id.in_(ids)).all())
+    db.close()
+
+    assert len([statement for statement in statements if statement.startswith("INSERT INTO games")]) == 1
+    assert [scores[id] for id in ids] == [1, 3, 2]
+
+
+def test_batch_size_is_limited():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.post(f"{GAMES_URL}/batch", json={"games": [{"score": 1}] * 101}, headers=get_auth_headers(user))
+
+    assert response.status_code == 422
+
+
+def test_games_query_count_does_not_grow_with_result_size():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    def create_games():
+        for score in range(3):
+            client.post(f"{GAMES_URL}", json={"score": score}, headers=headers)
+
+    create_games()
+
+    assert_queries_do_not_scale(lambda: client.get(f"{GAMES_URL}", headers=headers), create_games)
+
+
+@pytest.mark.parametrize("source", ["games", "best_scores", "memory"])
+def test_leaderboard_query_count_does_not_grow_with_result_size(monkeypatch, source):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    def create_games():
+        for score in range(3):
+            player = create_user(db, fake.password())
+            client.post(f"{GAMES_URL}", json={"score": score}, headers=get_auth_headers(player))
+
+    monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SOURCE", source)
+    monkeypatch.setattr(leaderboard_service, "memory_state", leaderboard_service.MemoryLeaderboardState())
+
+    create_games()
+
+    with TestClient(app):
+        assert_queries_do_not_scale(lambda: client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers), create_games)
+
+
+def test_admin_exports_games_as_ndjson_and_csv():
+    db = get_db()
+
+    admin = create_user(db, fake.password())
+    db.query(User).filter(User.id == admin.id).update({"is_admin": True})
+    db.commit()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    for score in (11, 12):
+        client.post(f"{GAMES_URL}", json={"score": score}, headers=headers)
+
+    games = db.query(Game).filter(Game.user_id == user.id).order_by(Game.id).all()
+    db.close()
+
+    params = {"user_id": user.id, "created_from": games[0].created_on.isoformat()}
+    ndjson = client.get(f"{GAMES_URL}/export", params=params, headers=get_auth_headers(admin))
+    csv = client.get(f"{GAMES_URL}/export", params={**params, "format": "csv"}, headers=get_auth_headers(admin))
+
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["score"] for line in ndjson.text.splitlines()] == [11, 12]
+    assert csv.text.splitlines() == [
+        "id,user_id,username,score,created_on",
+        *(f"{game.id},{user.id},{user.username},{game.score},{game.created_on.isoformat()}" for game in games)
+    ]
+
+
+def test_non_admin_user_cannot_export_games():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{GAMES_URL}/export", headers=get_auth_headers(user))
+
+    assert response.status_code == 403
+
+
+def test_user_cannot_get_game_of_another_user():
+    db = get_db()
+
+    game = create_game(db)
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{GAMES_URL}/{game.id}", headers=get_auth_headers(user))
+
+    assert response.status_code == 403
+
+
+def test_unauthenticated_user_cannot_get_games():
+    response = client.get(f"{GAMES_URL}")
+
+    assert response.status_code == 401
+
+
+def test_leaderboards_list_best_score_once_per_user():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    for score in (10 ** 8, 10 ** 9, 10 ** 7):
+        client.post(f"{GAMES_URL}", json={"score": score}, headers=headers)
+
+    for leaderboard in ("daily-leaderboard", "weekly-leaderboard", "all-time-leaderboard"):
+        response = client.get(f"{GAMES_URL}/{leaderboard}", headers=headers)
+        entries = [entry for entry in response.json()["items"] if entry["username"] == user.username]
+        scores = [entry["score"] for entry in response.json()["items"]]
+
+        assert response.status_code == 200
+        assert [entry["score"] for entry in entries] == [10 ** 9]
+        assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("sqlite_version", [(3, 39, 0), (3, 24, 0)])
+def test_games_leaderboard_ranks_and_limits_in_sql(monkeypatch, sqlite_version):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    for score in (7, 9, 9):
+        client.post(f"{GAMES_URL}", json={"score": score}, headers=headers)
+
+    monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SOURCE", "games")
+    monkeypatch.setattr(leaderboard_service.sqlite3, "sqlite_version_info", sqlite_version)
+
+    response = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers)
+    entries = [entry for entry in response.json()["items"] if entry["username"] == user.username]
+    scores = [entry["score"] for entry in response.json()["items"]]
+
+    assert response.status_code == 200
+    assert [entry["score"] for entry in entries] == [9]
+    assert scores == sorted(scores, reverse=True)
+
+    monkeypatch.setattr(game_service, "DAILY_LEADERBOARD_LIMIT", 2)
+
+    response = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers)
+
+    assert len(response.json()["items"]) == 2
+
+
+@pytest.mark.parametrize("source", ["games", "best_scores", "memory"])
+def test_leaderboard_pages_follow_cursor_without_repeats(monkeypatch, source):
+    db = get_db()
+
+    for score in (10, 20, 20, 30):
+        user = create_user(db, fake.password())
+        client.post(f"{GAMES_URL}", json={"score": score}, headers=get_auth_headers(user))
+
+    monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SOURCE", source)
+    monkeypatch.setattr(leaderboard_service, "memory_state", leaderboard_service.MemoryLeaderboardState())
+
+    with TestClient(app):
+        full = client.get(f"{GAMES_URL}/daily-leaderboard", headers=get_auth_headers(user)).json()
+
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = client.get(f"{GAMES_URL}/daily-leaderboard", params=params, headers=get_auth_headers(user)).json()
+            ids += [entry["id"] for entry in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+    assert ids == [entry["id"] for entry in full["items"]]
+
+
+def test_invalid_cursor_is_rejected():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{GAMES_URL}", params={"cursor": "not-a-cursor"}, headers=get_auth_headers(user))
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("url, values", [
+    (f"{GAMES_URL}", (10 ** 30,)),
+    (f"{GAMES_URL}/daily-leaderboard", (10 ** 30, 0, 1, 1)),
+    (f"{GAMES_URL}/daily-leaderboard", (1, 10 ** 18, 1, 1)),
+    (f"{GAMES_URL}/daily-leaderboard", (1, 0, 1, -1)),
+])
+def test_out_of_range_cursor_is_rejected(url, values):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(url, params={"cursor": pagination.encode_cursor(*values)}, headers=get_auth_headers(user))
+
+    assert response.status_code == 400
+
+
+def test_forged_leaderboard_cursor_is_rejected():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    for score in (1, 2):
+        client.post(f"{GAMES_URL}", json={"score": score}, headers=headers)
+
+    cursor = client.get(f"{GAMES_URL}/daily-leaderboard", params={"limit": 1}, headers=headers).json()["next_cursor"]
+    payload, signature = cursor.split(".")
+
+    score, created_on_us, game_id, served = json.loads(pagination.decode_base64(payload))
+    forged = f"{pagination.encode_base64(json.dumps([score, created_on_us, game_id, 0]).encode())}.{signature}"
+
+    response = client.get(f"{GAMES_URL}/daily-leaderboard", params={"cursor": forged}, headers=headers)
+
+    assert response.status_code == 400
+
+
+
+def test_unchanged_leaderboard_answers_304_without_database_queries():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    response = client.get(f"{GAMES_URL}/weekly-leaderboard", headers=headers)
+    etag = response.headers["ETag"]
+
+    with count_queries() as statements:
+        response = client.get(f"{GAMES_URL}/weekly-leaderboard", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert "Cache-Control" in response.headers
+    assert statements == []
+
+    client.post(f"{GAMES_URL}", json={"score": 1}, headers=headers)
+
+    response = client.get(f"{GAMES_URL}/weekly-leaderboard", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_leaderboard_etag_is_shared_across_workers(monkeypatch):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    client.post(f"{GAMES_URL}", json={"score": 1}, headers=headers)
+
+    etag = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers).headers["ETag"]
+
+    # A fresh version state stands in for another worker, or this one after a restart
+    monkeypatch.setattr(leaderboard_service, "version_state", leaderboard_service.LeaderboardVersionState())
+
+    response = client.get(f"{GAMES_URL}/daily-leaderboard", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+def test_leaderboards_are_served_from_snapshot_until_max_staleness(monkeypatch):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SNAPSHOT_SECONDS", 3600)
+    monkeypatch.setattr(leaderboard_service, "snapshot_state", leaderboard_service.LeaderboardSnapshotState())
+
+    with TestClient(app):
+        client.post(f"{GAMES_URL}", json={"score": 15 * 10 ** 8}, headers=headers)
+
+        with count_queries() as statements:
+            response = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers)
+
+        assert user.username not in [entry["username"] for entry in response.json()["items"]]
+        assert statements == []
+
+        monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SNAPSHOT_MAX_STALENESS_SECONDS", -1)
+
+        response = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers)
+
+    assert response.json()["items"][0]["username"] == user.username
+
+
+def test_memory_leaderboards_are_warmed_from_games_and_updated_on_create(monkeypatch):
+    db = get_db()
+
+    game = create_game(db)
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    monkeypatch.setattr(leaderboard_service, "LEADERBOARD_SOURCE", "memory")
+    monkeypatch.setattr(leaderboard_service, "memory_state", leaderboard_service.MemoryLeaderboardState())
+
+    client.post(f"{GAMES_URL}", json={"score": 5}, headers=headers)
+
+    with TestClient(app):
+        client.post(f"{GAMES_URL}", json={"score": 2 * 10 ** 9}, headers=headers)
+
+        response = client.get(f"{GAMES_URL}/all-time-leaderboard", headers=headers)
+
+    entries = {entry["id"]: entry for entry in response.json()["items"]}
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["username"] == user.username
+    assert response.json()["items"][0]["score"] == 2 * 10 ** 9
+    assert entries[game.id]["score"] == game.score
+
+
+def use_buffered_ingestion(monkeypatch, log_path) -> None:
+    monkeypatch.setattr(game_ingestion_service, "GAME_INGESTION_MODE", "buffered")
+    monkeypatch.setattr(game_ingestion_service, "GAME_INGESTION_ACK", "logged")
+    monkeypatch.setattr(game_ingestion_service, "GAME_INGESTION_LOG_PATH", str(log_path))
+    monkeypatch.setattr(game_ingestion_service, "state", game_ingestion_service.GameIngestionState())
+    monkeypatch.setattr(leaderboard_service, "pending_state", leaderboard_service.PendingGameState())
+
+
+def get_logged_games(log_path) -> list:
+    return [record for record in map(json.loads, log_path.read_text().splitlines()) if "sequence" in record]
+
+
+def test_buffered_games_are_ranked_before_they_are_flushed(monkeypatch, tmp_path):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+    log_path = tmp_path / "games.log"
+
+    use_buffered_ingestion(monkeypatch, log_path)
+
+    response = client.post(f"{GAMES_URL}", json={"score": 16 * 10 ** 8}, headers=headers)
+    leaderboard = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers).json()["items"]
+    entries = [entry for entry in leaderboard if entry["username"] == user.username]
+
+    assert response.status_code == 200
+    assert response.json()["id"] is None
+    assert entries == [{**response.json(), "id": None}]
+    assert db.query(Game).filter(Game.user_id == user.id).count() == 0
+    assert [record["score"] for record in get_logged_games(log_path)] == [16 * 10 ** 8]
+
+    asyncio.run(game_ingestion_service.stop())
+
+    leaderboard = client.get(f"{GAMES_URL}/daily-leaderboard", headers=headers).json()["items"]
+    entries = [entry for entry in leaderboard if entry["username"] == user.username]
+    game = db.query(Game).filter(Game.user_id == user.id).one()
+    db.close()
+
+    assert [entry["id"] for entry in entries] == [game.id]
+    assert get_logged_games(log_path) == []
+
+
+def test_buffered_games_are_replayed_from_log_after_checkpoint(monkeypatch, tmp_path):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    log_path = tmp_path / "games.log"
+
+    records = [
+        {"sequence": 1, "user_id": user.id, "score": 3, "created_on": "2020-01-01T00:00:00"},
+        {"checkpoint": 1},
+        {"sequence": 2, "user_id": user.id, "score": 4, "created_on": "2020-01-01T00:00:01"}
+    ]
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    use_buffered_ingestion(monkeypatch, log_path)
+
+    with TestClient(app):
+        pass
+
+    scores = [game.score for game in db.query(Game).filter(Game.user_id == user.id)]
+    db.close()
+
+    assert scores == [4]
+    assert get_logged_games(log_path) == []
+
+
+def test_replay_skips_games_committed_after_the_last_log_checkpoint(monkeypatch, tmp_path):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    log_id = uuid.uuid4().hex
+    log_path = tmp_path / "games.log"
+
+    db.add(GameIngestionCheckpoint(log_id=log_id, sequence=2))
+    db.commit()
+
+    records = [
+        {"log_id": log_id, "checkpoint": 0},
+        {"sequence": 1, "user_id": user.id, "score": 3, "created_on": "2020-01-01T00:00:00"},
+        {"sequence": 2, "user_id": user.id, "score": 4, "created_on": "2020-01-01T00:00:01"},
+        {"sequence": 3, "user_id": user.id, "score": 5, "created_on": "2020-01-01T00:00:02"}
+    ]
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    use_buffered_ingestion(monkeypatch, log_path)
+
+    with TestClient(app):
+        pass
+
+    scores = [game.score for game in db.query(Game).filter(Game.user_id == user.id)]
+    db.close()
+
+    assert scores == [5]
+    assert get_logged_games(log_path) == []
+
+
+def test_refused_buffered_game_is_set_aside_without_blocking_later_games(monkeypatch, tmp_path):
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    log_path = tmp_path / "games.log"
+
+    records = [
+        {"sequence": 1, "user_id": user.id, "score": 3, "created_on": "2020-01-01T00:00:00"},
+        {"sequence": 2, "user_id": user.id, "score": 10 ** 30, "created_on": "2020-01-01T00:00:01"},
+        {"sequence": 3, "user_id": user.id, "score": 5, "created_on": "2020-01-01T00:00:02"}
+    ]
+    log_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    use_buffered_ingestion(monkeypatch, log_path)
+
+    with TestClient(app):
+        response = client.post(f"{GAMES_URL}", json={"score": 10 ** 30}, headers=get_auth_headers(user))
+
+    scores = [game.score for game in db.query(Game).filter(Game.user_id == user.id).order_by(Game.id)]
+    db.close()
+
+    rejected = [json.loads(line) for line in (tmp_path / "games.log.rejected").read_text().splitlines()]
+
+    assert response.status_code == 422
+    assert scores == [3, 5]
+    assert [record["sequence"] for record in rejected] == [2]
+    assert get_logged_games(log_path) == []
+
+
+def test_games_enqueued_around_a_flush_are_replayed_exactly_once(monkeypatch, tmp_path):
+    db = get_db()
+
+    principal = user_to_principal(create_user(db, fake.password()))
+    log_path = tmp_path / "games.log"
+
+    use_buffered_ingestion(monkeypatch, log_path)
+
+    async def enqueue(score: int):
+        return await game_ingestion_service.enqueue(principal, GameCreateRequest(score=score))
+
+    async def crash_after_interleaved_enqueues():
+        first = asyncio.ensure_future(enqueue(3))
+        await asyncio.sleep(0)
+
+        flushed = asyncio.ensure_future(game_ingestion_service.flush())
+        second = asyncio.ensure_future(enqueue(4))
+        await asyncio.gather(first, flushed, second)
+
+        await enqueue(5)
+        game_ingestion_service.state.log.close()
+
+    asyncio.run(crash_after_interleaved_enqueues())
+
+    monkeypatch.setattr(game_ingestion_service, "state", game_ingestion_service.GameIngestionState())
+    monkeypatch.setattr(leaderboard_service, "pending_state", leaderboard_service.PendingGameState())
+
+    with TestClient(app):
+        pass
+
+    scores = sorted(game.score for game in db.query(Game).filter(Game.user_id == principal.id))
+    db.close()
+
+    assert scores == [3, 4, 5]
+    assert get_logged_games(log_path) == []
+
+
+def test_ingestion_log_is_locked_to_one_process(monkeypatch, tmp_path):
+    use_buffered_ingestion(monkeypatch, tmp_path / "games.log")
+
+    game_ingestion_service.open_log()
+
+    with pytest.raises(RuntimeError):
+        game_ingestion_service.open_log()
+
+    game_ingestion_service.state.log.close()
+
+
+def test_backfill_rebuilds_user_best_scores():
+    db = get_db()
+
+    game = create_game(db)
+
+    backfill_user_best_scores(db)
+    db.commit()
+
+    db.query(UserBestScore).filter(UserBestScore.user_id == game.user_id).update({
+        UserBestScore.best_score: game.score + 100,
+        UserBestScore.game_id: create_game(db).id
+    })
+    db.commit()
+
+    backfill_user_best_scores(db)
+    db.commit()
+
+    best_score = db.query(UserBestScore).filter(
+        UserBestScore.user_id == game.user_id,
+        UserBestScore.period == LeaderboardPeriod.ALL_TIME.name
+    ).first()
+    db.close()
+
+    assert best_score.best_score == game.score
+    assert best_score.game_id == game.id
@@ -0,0 +1,36 @@
+import logging
+
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+from app.config.loguru_logging_intercept import InterceptHandler
+from app.domain.database import log_slow_queries
+
+
+class UnformattableMessage:
+    def __str__(self):
+        raise AssertionError("message formatted for a record below the handler level")
+
+
+def test_intercept_handler_drops_records_below_its_level_before_formatting():
+    handler = InterceptHandler(level=logging.WARNING)
+    record = logging.LogRecord("sqlalchemy.engine", logging.INFO, __file__, 1, UnformattableMessage(), None, None)
+
+    handler.handle(record)
+
+
+def test_slow_queries_are_logged_with_their_duration():
+    records = []
+    handler_id = logger.add(records.append, level="WARNING", format="{message}")
+
+    engine = create_engine("sqlite://")
+    log_slow_queries(engine, 0)
+
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    finally:
+        logger.remove(handler_id)
+
+    assert [record.record["extra"]["statement"] for record in records] == ["SELECT 1"]
+    assert records[0].record["extra"]["duration_ms"] >= 0
@@ -0,0 +1,93 @@
+from fastapi.testclient import TestClient
+from faker import Faker
+
+from app.data.models import User
+from app.domain.config import REQUEST_TIMING
+from app.domain.constants import GAMES_URL, METRICS_URL
+from app.main import app
+from tests.domain import create_user
+from tests.utils import get_auth_headers, get_db
+
+client = TestClient(app)
+fake = Faker()
+
+
+def test_admin_can_get_database_pool_metrics():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    db.query(User).filter(User.id == user.id).update({"is_admin": True})
+    db.commit()
+    db.close()
+
+    response = client.get(f"{METRICS_URL}/db-pool", headers=get_auth_headers(user))
+    pool = response.json()[0]
+
+    assert response.status_code == 200
+    assert pool["engine"] == "sync"
+    assert pool["checkouts"] > 0
+    assert pool["max_wait_ms"] >= pool["average_wait_ms"]
+
+
+def test_admin_can_get_single_flight_metrics():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    db.query(User).filter(User.id == user.id).update({"is_admin": True})
+    db.commit()
+    db.close()
+
+    client.get(f"{GAMES_URL}/daily-leaderboard", headers=get_auth_headers(user))
+
+    response = client.get(f"{METRICS_URL}/single-flight", headers=get_auth_headers(user))
+    groups = {group["name"]: group for group in response.json()}
+
+    assert response.status_code == 200
+    assert groups["get_leaderboard_page"]["executions"] >= 1
+
+
+def test_admin_can_scrape_prometheus_metrics():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    db.query(User).filter(User.id == user.id).update({"is_admin": True})
+    db.commit()
+    db.close()
+
+    client.get(f"{GAMES_URL}/daily-leaderboard", headers=get_auth_headers(user))
+    client.get(f"{GAMES_URL}/123456789", headers=get_auth_headers(user))
+
+    response = client.get(f"{METRICS_URL}/prometheus", headers=get_auth_headers(user))
+    route = f"{GAMES_URL}/daily-leaderboard"
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert f'amber_http_requests_total{{method="GET",route="{route}",status_code="200"}}' in response.text
+    assert f'amber_http_requests_total{{method="GET",route="{GAMES_URL}/{{id}}",status_code="404"}}' in response.text
+    assert f'amber_http_request_duration_seconds_count{{method="GET",route="{route}"}}' in response.text
+    assert f'amber_db_queries_total{{route="{route}"}}' in response.text or not REQUEST_TIMING
+    assert 'amber_db_pool_checkouts_total{engine="sync"}' in response.text
+    assert 'amber_http_requests_in_progress{method="GET"} 1.0' in response.text
+
+
+def test_non_admin_cannot_get_prometheus_metrics():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{METRICS_URL}/prometheus", headers=get_auth_headers(user))
+
+    assert response.status_code == 403
+
+
+def test_non_admin_cannot_get_database_pool_metrics():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{METRICS_URL}/db-pool", headers=get_auth_headers(user))
+
+    assert response.status_code == 403
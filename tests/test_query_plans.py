@@ -0,0 +1,49 @@
+"""EXPLAIN checks for the composite indexes on games and user_tokens
+
+Each test compiles the query a service issues and asserts the SQLite planner searches the
+index built for that access pattern rather than scanning the table. When a query or index
+changes shape, run the same EXPLAIN (EXPLAIN ANALYZE on PostgreSQL) to confirm the plan.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import desc, select
+
+from app.data.models import Game, UserToken
+from app.services import leaderboard_service
+from tests.utils import get_db
+
+
+def explain(query) -> str:
+    db = get_db()
+
+    compiled = query.compile(bind=db.get_bind())
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters).fetchall()
+    db.close()
+
+    return "\n".join(row[-1] for row in plan)
+
+
+def test_leaderboard_window_reads_games_through_composite_index():
+    query = leaderboard_service.get_top_games_query(datetime.utcnow() - timedelta(days=1), None, 10)
+
+    games_plan = [line for line in explain(query).splitlines() if " games " in f"{line} "]
+
+    assert games_plan and all("USING INDEX ix_games_" in line for line in games_plan)
+
+
+def test_games_since_search_created_on_score_index():
+    query = select(Game.created_on, Game.score).where(Game.created_on >= datetime.utcnow() - timedelta(days=1))
+
+    assert "USING COVERING INDEX ix_games_created_on_score (created_on>?)" in explain(query)
+
+
+def test_user_games_search_user_id_score_index():
+    query = select(Game).where(Game.user_id == 1).order_by(desc(Game.score), Game.created_on)
+
+    assert "USING INDEX ix_games_user_id_score (user_id=?)" in explain(query)
+
+
+def test_user_token_lookup_searches_user_id_token_type_index():
+    query = select(UserToken).where(UserToken.user_id == 1, UserToken.token_type == "RESET_PASSWORD")
+
+    assert "USING INDEX ix_user_tokens_user_id_token_type (user_id=? AND token_type=?)" in explain(query)
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from app.commonhelper.ranked_leaderboard import RankedLeaderboard, pack, unpack
+
+
+def test_entry_round_trips_through_packed_key():
+    created_on = datetime(2022, 5, 17, 13, 45, 12, 345678)
+
+    entry = unpack(pack(12, 345, -7, created_on))
+
+    assert (entry.user_id, entry.game_id, entry.score, entry.created_on) == (12, 345, -7, created_on)
+
+
+def test_board_keeps_best_game_per_user_ordered_by_score_then_created_on():
+    board = RankedLeaderboard()
+    now = datetime(2022, 5, 17)
+
+    assert board.record(1, 1, 50, now)
+    assert board.record(2, 2, 80, now + timedelta(seconds=1))
+    assert board.record(3, 3, 80, now)
+    assert not board.record(1, 4, 40, now + timedelta(seconds=2))
+    assert not board.record(3, 5, 80, now + timedelta(seconds=3))
+    assert board.record(1, 6, 90, now + timedelta(seconds=4))
+
+    assert [(entry.user_id, entry.game_id, entry.score) for entry in board.top()] == [(1, 6, 90), (3, 3, 80), (2, 2, 80)]
+    assert [entry.user_id for entry in board.top(2)] == [1, 3]
+    assert [entry.user_id for entry in board.top(2, after=board.top(1)[0])] == [3, 2]
+    assert board.rank(2) == 3
+    assert len(board) == 3
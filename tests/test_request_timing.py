@@ -0,0 +1,54 @@
+import pytest
+import re
+
+from fastapi.testclient import TestClient
+from faker import Faker
+from loguru import logger
+
+from app.domain.config import REQUEST_TIMING
+from app.domain.constants import GAMES_URL
+from app.main import app
+from app.middleware import access_log
+from tests.domain import create_user
+from tests.utils import get_auth_headers, get_db
+
+client = TestClient(app)
+fake = Faker()
+
+pytestmark = pytest.mark.skipif(not REQUEST_TIMING, reason="request timing is disabled")
+
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries", auth;dur=([\d.]+), serialize;dur=([\d.]+)')
+
+
+def test_responses_report_db_auth_and_serialize_time():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{GAMES_URL}/all-time-leaderboard", headers=get_auth_headers(user))
+    db_ms, queries, auth_ms, serialize_ms = SERVER_TIMING.fullmatch(response.headers["Server-Timing"]).groups()
+
+    assert response.status_code == 200
+    assert int(queries) >= 1
+    assert float(db_ms) > 0
+    assert float(auth_ms) > 0
+    assert float(serialize_ms) > 0
+
+
+def test_access_log_records_request_phases():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    records = []
+    handler_id = logger.add(records.append, filter=access_log.__name__, format="{message}")
+
+    try:
+        client.get(f"{GAMES_URL}/all-time-leaderboard", headers=get_auth_headers(user))
+    finally:
+        logger.remove(handler_id)
+
+    extra = records[0].record["extra"]
+
+    assert extra["db_queries"] >= 1
+    assert extra["db_ms"] > 0
+    assert set(extra) >= {"auth_ms", "serialize_ms"}
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+
+from app.commonhelper.single_flight import single_flight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    executions = []
+
+    @single_flight()
+    async def load(period: int):
+        executions.append(period)
+        await asyncio.sleep(0.01)
+        return [period]
+
+    async def run():
+        return await asyncio.gather(*(load(period) for period in (1, 1, 1, 2)))
+
+    results = asyncio.run(run())
+
+    assert results == [[1], [1], [1], [2]]
+    assert sorted(executions) == [1, 2]
+    assert load.single_flight_group.coalesced == 2
+    assert load.single_flight_group.in_flight == {}
+
+
+def test_failure_is_shared_and_not_cached():
+    executions = []
+
+    @single_flight()
+    async def fail():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(fail(), fail(), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(run())] == [ValueError, ValueError]
+
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+
+    assert len(executions) == 2
@@ -1,10 +1,14 @@
+import asyncio
+
 from fastapi.testclient import TestClient
 from faker import Faker
 
 from app.data.models import User
 from app.domain.constants import USERS_URL
 from app.main import app
-from tests.utils import get_db
+from app.services import user_service
+from tests.domain import create_user
+from tests.utils import get_auth_headers, get_db
 
 client = TestClient(app)
 fake = Faker()
@@ -28,3 +32,80 @@ def test_can_create_user():
     assert response.status_code == 200
     assert response.json().get("username") == payload["email"]
     assert user_exists
+
+
+def test_user_can_get_current_user():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{USERS_URL}/me", headers=get_auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.json().get("id") == user.id
+    assert response.json().get("username") == user.username
+    assert response.json().get("first_name") == user.fname
+
+
+def test_non_admin_user_cannot_get_users():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+
+    response = client.get(f"{USERS_URL}", headers=get_auth_headers(user))
+
+    assert response.status_code == 403
+
+
+def test_admin_pages_through_users_by_id():
+    db = get_db()
+
+    admin = create_user(db, fake.password())
+    create_user(db, fake.password())
+
+    db.query(User).filter(User.id == admin.id).update({"is_admin": True})
+    db.commit()
+    db.close()
+
+    headers = get_auth_headers(admin)
+
+    first = client.get(f"{USERS_URL}", params={"limit": 1}, headers=headers).json()
+    second = client.get(f"{USERS_URL}", params={"limit": 1, "cursor": first["next_cursor"]}, headers=headers).json()
+
+    assert len(first["items"]) == 1
+    assert second["items"][0]["id"] > first["items"][0]["id"]
+
+
+def test_current_user_reflects_avatar_change():
+    db = get_db()
+
+    user = create_user(db, fake.password())
+    headers = get_auth_headers(user)
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.json().get("avatar") is None
+
+    response = client.put(f"{USERS_URL}/avatar", json={"avatar": 3}, headers=headers)
+
+    assert response.status_code == 200
+
+    response = client.get(f"{USERS_URL}/me", headers=headers)
+
+    assert response.json().get("avatar") == 3
+
+
+def test_coalesced_users_page_survives_first_caller_cancelling():
+
+    async def run():
+        first = asyncio.ensure_future(user_service.get_users_page(None, 1))
+        second = asyncio.ensure_future(user_service.get_users_page(None, 1))
+
+        await asyncio.sleep(0)
+        first.cancel()
+
+        return await second
+
+    page = asyncio.run(run())
+
+    assert len(page.items) == 1
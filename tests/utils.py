@@ -1,7 +1,13 @@
+from contextlib import contextmanager
+from sqlalchemy import event
 from sqlalchemy.orm.session import Session
+from typing import Any, Callable, Iterator, List
 
-from app.data.models import Base
+from app.data.models import Base, User
+from app.domain import database
 from app.domain.database import SessionLocal, engine
+from app.mappings.auth_mappings import user_to_token_claims
+from app.services import auth_service
 
 
 def get_db() -> Session:
@@ -9,6 +15,54 @@ def get_db() -> Session:
     return db
 
 
+def get_auth_headers(user: User) -> dict:
+    data = {**user_to_token_claims(user), "exp": auth_service.get_expiry(None)}
+    access_token = auth_service.generate_access_token(data)
+
+    return {"Authorization": f"Bearer {access_token.access_token}"}
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """Collect every statement sent to the database while the block runs"""
+
+    statements = []
+    engines = [engine] + ([database.async_engine.sync_engine] if database.async_engine else [])
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+def assert_queries_do_not_scale(call: Callable[[], Any], grow: Callable[[], Any]):
+    """Fail when call issues more queries after grow has added rows to its result
+
+    call runs once before each measurement, so one-off work such as reloading invalidated
+    leaderboard ETags is not counted.
+    """
+
+    call()
+
+    with count_queries() as before:
+        call()
+
+    grow()
+    call()
+
+    with count_queries() as after:
+        call()
+
+    assert len(after) == len(before), "\n".join(after)
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 